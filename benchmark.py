@@ -0,0 +1,169 @@
+''' benchmarks of the laurent module on generated sparse and dense polynomials of increasing size,
+
+python benchmark.py run -o new.json              runs all benchmarks and writes the timings as JSON
+python benchmark.py run --quick --filter mul     fewer and smaller workloads, only names containing 'mul'
+python benchmark.py run --budget 2               at most about 2 seconds of timing per benchmark
+python benchmark.py compare old.json new.json    lists the changes, exits with 1 if something got slower
+'''
+
+import sys
+import json
+import time
+import random
+import timeit
+import argparse
+import platform
+
+from laurent import laurent
+
+VARIABLES = 'xyzwuv'
+
+
+def term_string(coef, exponents):
+    ''' the term coef * monomial as a string, exponents is a dictionary variable -> exponent '''
+    return str(coef) + ''.join(v + ('^' + str(e) if e != 1 else '') for v, e in sorted(exponents.items()) if e != 0)
+
+def polynomial_string(terms):
+    ''' sum of term strings, as laurent parses it '''
+    return ' '.join(t if i == 0 or t[0] == '-' else '+' + t for i, t in enumerate(terms))
+
+# workloads are strings, so they can be read by every version of the module
+
+def sparse(rng, terms, nvars, degree):
+    ''' terms of a random polynomial with about terms terms in nvars variables, exponents in [-degree, degree] '''
+    monomials = {}
+    while len(monomials) < terms:
+        m = tuple(rng.randint(-degree, degree) for v in VARIABLES[:nvars])
+        monomials[m] = rng.choice([-1, 1]) * rng.randint(1, 99)
+    return [term_string(c, dict(zip(VARIABLES, m))) for m, c in monomials.items()]
+
+def dense(rng, degree, nvars):
+    ''' terms of a random polynomial with every monomial of exponents in [0, degree] in nvars variables '''
+    box = [()]
+    for v in VARIABLES[:nvars]:
+        box = [m + ((v, e),) for m in box for e in range(degree + 1)]
+    return [term_string(rng.choice([-1, 1]) * rng.randint(1, 99), dict(m)) for m in box]
+
+def workloads(quick):
+    ''' (name, p, q) triples, p and q are lists of terms, names give the kind, number of terms and of variables '''
+    rng = random.Random(2024)
+    sizes = [(10, 1), (100, 2), (300, 3)] if quick else [(10, 1), (100, 2), (1000, 3), (3000, 5)]
+    for terms, nvars in sizes:
+        yield 'sparse-%d-%dv' % (terms, nvars), sparse(rng, terms, nvars, 10), sparse(rng, terms, nvars, 10)
+    boxes = [(9, 1), (9, 2)] if quick else [(9, 1), (9, 2), (30, 2), (9, 3)]
+    for degree, nvars in boxes:
+        p = dense(rng, degree, nvars)
+        yield 'dense-%d-%dv' % (len(p), nvars), p, dense(rng, degree, nvars)
+
+def uncached(p):
+    ''' p without the data it caches (see laurent._cache), so a benchmark measures the computation '''
+    cache = getattr(p, '_cache', None)
+    if cache: cache.clear()
+    return p
+
+def benchmarks(quick):
+    ''' (name, function) pairs, each function runs one operation once '''
+    for name, p_terms, q_terms in workloads(quick):
+        s = polynomial_string(p_terms)
+        p, q = laurent(s), laurent(polynomial_string(q_terms))
+        small = laurent(polynomial_string(p_terms[:3]))
+        values = {v: 1 + i / 10 for i, v in enumerate(sorted(set(p.vars())))}
+        collected = sorted(set(p.vars()))[:1]
+        yield name + '/parse', lambda s = s: laurent(s)
+        yield name + '/add', lambda p = p, q = q: p + q
+        if len(p_terms) * len(q_terms) <= 10 ** 6:
+            yield name + '/mul', lambda p = p, q = q: p * q
+            yield name + '/divmod', lambda p = p, q = q: divmod(p * q, q)
+        yield name + '/pow', lambda small = small: small ** 8
+        yield name + '/call', lambda p = p, values = values: uncached(p)(values)
+        yield name + '/collect', lambda p = p, collected = collected: uncached(p).collect(collected)
+        yield name + '/min_deg', lambda p = p: uncached(p).min_deg()
+        yield name + '/max_deg', lambda p = p: uncached(p).max_deg()
+        yield name + '/span', lambda p = p: uncached(p).span()
+
+def measure(f, repeat, budget):
+    ''' timing of f as a result entry: the best of repeat runs of a number of loops (see timeit), fewer repeats if
+    they would take longer than budget seconds; if one call takes longer than the budget, that call is the timing
+    (marked capped), and an exception is recorded as the error instead '''
+    try:
+        start = time.perf_counter()
+        f()
+        once = time.perf_counter() - start
+        if once > budget:
+            return {'seconds': once, 'loops': 1, 'repeat': 1, 'capped': True}
+        timer = timeit.Timer(f)
+        loops, seconds = timer.autorange()
+        repeat = max(1, min(repeat, int(budget / seconds)))
+        return {'seconds': min(timer.repeat(repeat, loops)) / loops, 'loops': loops, 'repeat': repeat}
+    except Exception as e:
+        return {'error': '%s: %s' % (type(e).__name__, e)}
+
+def run(args):
+    results = {}
+    for name, f in benchmarks(args.quick):
+        if args.filter and args.filter not in name: continue
+        results[name] = result = measure(f, args.repeat, args.budget)
+        if 'error' in result:
+            print('%-32s error %s' % (name, result['error']))
+        else:
+            print('%-32s %12.6f ms%s' % (name, result['seconds'] * 1000, ' (capped)' if result.get('capped') else ''))
+
+    report = {
+        'meta': {'python': platform.python_version(), 'platform': platform.platform(),
+                 'time': time.strftime('%Y-%m-%dT%H:%M:%S'), 'quick': args.quick, 'budget': args.budget},
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent = 1, sort_keys = True)
+    return 0
+
+def compare(args):
+    with open(args.old) as f: old = json.load(f)['results']
+    with open(args.new) as f: new = json.load(f)['results']
+
+    regressions = 0
+    for name in sorted(set(old) & set(new)):
+        failed = [f for f, results in ((args.old, old), (args.new, new)) if 'error' in results[name]]
+        if failed:
+            if 'error' not in old[name]: regressions += 1 # broken by the new version
+            print('%-32s error in %s' % (name, ' and '.join(failed)))
+            continue
+        ratio = new[name]['seconds'] / old[name]['seconds']
+        if ratio > 1 + args.threshold:
+            flag, regressions = 'REGRESSION', regressions + 1
+        elif ratio < 1 - args.threshold:
+            flag = 'faster'
+        else:
+            flag = ''
+        print('%-32s %12.6f %12.6f ms %7.2fx %s' % (name, old[name]['seconds'] * 1000, new[name]['seconds'] * 1000, ratio, flag))
+    for name in sorted(set(old) ^ set(new)):
+        print('%-32s only in %s' % (name, args.old if name in old else args.new))
+
+    print('%d regressions (threshold %d%%)' % (regressions, round(args.threshold * 100)))
+    return 1 if regressions else 0
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = 'benchmarks of the laurent module')
+    commands = parser.add_subparsers(dest = 'command')
+    commands.required = True # not a keyword argument before Python 3.7
+
+    p = commands.add_parser('run', help = 'run the benchmarks')
+    p.add_argument('-o', '--output', help = 'JSON file for the results')
+    p.add_argument('--quick', action = 'store_true', help = 'fewer and smaller workloads')
+    p.add_argument('--repeat', type = int, default = 5, help = 'timings per benchmark, the best is kept')
+    p.add_argument('--filter', help = 'only benchmarks with names containing this')
+    p.add_argument('--budget', type = float, default = 10.0, help = 'seconds of timing per benchmark (default 10)')
+    p.set_defaults(func = run)
+
+    p = commands.add_parser('compare', help = 'compare two result files')
+    p.add_argument('old')
+    p.add_argument('new')
+    p.add_argument('--threshold', type = float, default = 0.1, help = 'relative change flagged (default 0.1)')
+    p.set_defaults(func = compare)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+if __name__ == '__main__':
+    sys.exit(main())
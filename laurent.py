@@ -1,19 +1,35 @@
+import os
 import re
+import sys
+import math
+import time
+import mmap
+import array
+import struct
+import types
+import concurrent.futures
+import heapq
+import bisect
+import itertools
+import weakref
 import operator
-from collections import defaultdict
-from functools import reduce
-
-# compile RegEx's for parsing
-re_insert_plus = re.compile(r'^(?=\w)') # start of line with no alphanumerical
-re_insert_ones = re.compile(r'([-+](?!\d))') # +-char
-re_insert_carets = re.compile(r'([A-Z|a-z](?!\^))') # char without a following caret
-re_insert_whitespace = re.compile(r'(?<=\d)([-+])(?=\d)') # +- with decimals on both sides
-re_insert_star = re.compile(r'([A-Z|a-z])') # char
-re_whitespace = re.compile(r'\s') # whitespace
-re_star = re.compile(r'\*') # star
-re_brackets = re.compile(r'[()\[\]{}]') # bracketss
-re_star_star = re.compile(r'\*\*') # star
-re_star_caret = re.compile(r'[*^]') # star or carets
+import functools
+import tracemalloc
+from collections import defaultdict, OrderedDict
+
+try:
+    import numpy as np
+except ImportError:
+    np = None # dense multiplication of float coefficients falls back to mul_heap
+
+# polynomial strings are read term by term (see parse), whitespace and brackets are ignored
+re_term = re.compile(r'([-+]?)(\d+\.?\d*|\.\d+)?((?:\*?[A-Za-z](?:(?:\^|\*\*)[-+]?(?:\d+\.?\d*|\.\d+))?)*)') # sign, coefficient, factors
+re_factor = re.compile(r'([A-Za-z])(?:(?:\^|\*\*)([-+]?(?:\d+\.?\d*|\.\d+)))?') # variable, exponent
+ignored_chars = str.maketrans('', '', '()[]{} \t\n\r\f\v')
+
+# tokens of polynomial strings, the group matched gives the kind of the token (see parse_tokens)
+re_token = re.compile(r'(\d+\.?\d*|\.\d+)|([A-Za-z])|(\^|\*\*)|([-+])|(\*)|([()\[\]{}\s]+)|(.)')
+NUMBER, VARIABLE, CARET, SIGN, STAR, SKIP, INVALID, END = range(1, 9)
 
 
 #def sign_char(i):
@@ -24,8 +40,171 @@ re_star_caret = re.compile(r'[*^]') # star or carets
   #  'puts string s to int or float, depending on what s represents'
  #   return float(s) if 'x' in s else int(s)
 
+# shared table of variable names, all terms reference the same (interned) string objects
+var_table = {}
+
+def intern_var(v):
+    ''' returns the shared copy of variable name v from var_table '''
+    return var_table.setdefault(v, v)
+
+# Monomials are flat tuples of variables and exponents sorted by variable, zero exponents omitted,
+# e.g. x^2y^-3 is ('x', 2, 'y', -3). Ordering tuples gives the same order as sorting degree items.
+
+def mono_from_dict(d):
+    ''' builds a monomial tuple from a dictionary of variables and exponents '''
+    m = []
+    for v, e in sorted(d.items()):
+        if e != 0: m += (intern_var(v), e)
+    return tuple(m)
+
+def mono_mul(a, b):
+    ''' product of monomials a and b (adds exponents) '''
+    if not a: return b
+    if not b: return a
+    m, i, j, la, lb = [], 0, 0, len(a), len(b)
+    while i < la and j < lb:
+        if a[i] == b[j]:
+            e = a[i+1] + b[j+1]
+            if e != 0: m += (a[i], e)
+            i += 2
+            j += 2
+        elif a[i] < b[j]:
+            m += a[i:i+2]
+            i += 2
+        else:
+            m += b[j:j+2]
+            j += 2
+    return tuple(m) + a[i:] + b[j:]
+
+def mono_inv(a):
+    ''' inverse of monomial a (negates exponents) '''
+    return tuple(-x if i & 1 else x for i, x in enumerate(a))
+
+def mono_pow(a, n):
+    ''' n-th power of monomial a (multiplies exponents by n) '''
+    if n == 0: return ()
+    return tuple(x * n if i & 1 else x for i, x in enumerate(a))
+
+def exact_pow(x, e):
+    ''' x ** e, but stays an integer for x = 1 or x = -1 and negative integer e '''
+    if type(x) is int and (x == 1 or x == -1) and type(e) is int and e < 0: return x ** -e
+    return x ** e
+
+def isqrt(n):
+    ''' integer square root of n >= 0 by Newton's method (math.isqrt needs Python 3.8) '''
+    if n < 2: return n
+    x = 1 << (n.bit_length() + 1) // 2
+    while True:
+        y = (x + n // x) // 2
+        if y >= x: return x
+        x = y
+
+def inverse_mod(a, m):
+    ''' inverse of a modulo m by the extended Euclidean algorithm (pow(a, -1, m) needs Python 3.8) '''
+    r, r1, s, s1 = a % m, m, 1, 0
+    while r1:
+        q = r // r1
+        r, r1, s, s1 = r1, r - q * r1, s1, s - q * s1
+    if r != 1: raise ValueError(str(a) + ' is not invertible modulo ' + str(m) + '.')
+    return s % m
+
+def number(s):
+    ''' int or float, depending on what s represents '''
+    return float(s) if '.' in s else int(s)
+
+def parse(s):
+    ''' parses a polynomial string, e.g. 'x+2y^3 -4y^-1 + z^(-3)y**5', in one pass into a coefficient dictionary.
+    Variables are single letters, a term is an optional sign, an optional coefficient and variables with optional
+    exponents after ^ or **, factors may be separated by *, whitespace and brackets are ignored.
+    Raises ValueError naming the position of the first unexpected character (see parse_tokens). '''
+
+    t = s.translate(ignored_chars)
+    coefs, pos = {}, 0
+    while pos < len(t):
+        m = re_term.match(t, pos)
+        sign, coef, factors = m.groups()
+        if not (coef or factors) or (pos and not sign) or (not coef and factors[:1] == '*'):
+            return parse_tokens(s) # not a term, reports where
+        pos = m.end()
+
+        coef = number(coef) if coef else 1
+        if sign == '-': coef = -coef
+        if factors:
+            degree = {}
+            for v, e in re_factor.findall(factors):
+                degree[v] = degree.get(v, 0) + (number(e) if e else 1)
+            m = mono_from_dict(degree)
+        else:
+            m = ()
+
+        c = coefs.get(m, 0) + coef
+        if c != 0:
+            coefs[m] = c
+        elif m in coefs:
+            del coefs[m]
+
+    if not t: return parse_tokens(s)
+    return coefs
+
+def parse_tokens(s):
+    ''' parses a polynomial string like parse, but token by token, so errors are reported at their position in s '''
+
+    matches = [m for m in re_token.finditer(s) if m.lastindex != SKIP]
+    kinds = [m.lastindex for m in matches] + [END]
+    texts = [m.group() for m in matches]
+
+    def error(i):
+        if kinds[i] == END: raise ValueError("Unexpected end of polynomial '%s'." % s)
+        raise ValueError("Unexpected '%s' at position %d in polynomial '%s'." % (texts[i], matches[i].start(), s))
+
+    if kinds[0] == END: raise ValueError('Empty polynomial string.')
+    coefs, i = {}, 0
+    while kinds[i] != END:
+
+        negative = kinds[i] == SIGN and texts[i] == '-'
+        if kinds[i] == SIGN: i += 1
+
+        coef, degree = 1, {}
+        if kinds[i] == NUMBER:
+            coef = number(texts[i])
+            i += 1
+            if kinds[i] == STAR:
+                i += 1
+                if kinds[i] != VARIABLE: error(i)
+        elif kinds[i] != VARIABLE:
+            error(i)
+
+        while kinds[i] == VARIABLE:
+            v, e = texts[i], 1
+            i += 1
+            if kinds[i] == CARET:
+                i += 1
+                exponent_negative = kinds[i] == SIGN and texts[i] == '-'
+                if kinds[i] == SIGN: i += 1
+                if kinds[i] != NUMBER: error(i)
+                e = -number(texts[i]) if exponent_negative else number(texts[i])
+                i += 1
+            degree[v] = degree.get(v, 0) + e
+            if kinds[i] == STAR:
+                i += 1
+                if kinds[i] != VARIABLE: error(i)
+
+        if kinds[i] != SIGN and kinds[i] != END: error(i)
+
+        m = mono_from_dict(degree) if degree else ()
+        c = coefs.get(m, 0) + (-coef if negative else coef)
+        if c != 0:
+            coefs[m] = c
+        elif m in coefs:
+            del coefs[m]
+
+    return coefs
+
 class term:
     '''class representing a single multivariate term in laurent'''
+
+    # a term is a coefficient and a monomial tuple (see mono_from_dict), no instance dictionary
+    __slots__ = ('coef', 'mono')
     
     # Initialization, deletion, representation
      
@@ -38,36 +217,40 @@ class term:
         string (of the form '+ x^ay^bz^c...'),
         or empty (makes an empty term) '''
 
-        # by default laurent has variable one x
-
-
-
         if isinstance(s, term):
             self.coef = s.coef
-            self.degree = dict(s.degree)
+            self.mono = s.mono
 
         elif s == None:
             # make empty term
             self.coef = 0
-            pass
+            self.mono = ()
             
         elif isinstance(s, str):
-            s_split = re_star_caret.split(s)
-            self.coef = float(s_split[0]) if '.' in s_split[0] else int(s_split[0])
-            self.degree = {} # empty dict
-
-
-            for i in range(len(s_split)//2):
-                self.degree[s_split[i*2+1]] = float(s_split[i*2+2]) if '.' in s_split[i*2+2] else int(s_split[i*2+2])
+            coefs = parse(s)
+            if len(coefs) > 1: raise ValueError("Term called with more than one term '%s'." % s)
+            self.mono, self.coef = next(iter(coefs.items())) if coefs else ((), 0)
 
         elif isinstance(s, int) or isinstance(s, float):
             self.coef = s
-            self.degree = {}
+            self.mono = ()
 
         else: raise ValueError('Term called with wrong argument.')
 
         self.canonical()
 
+    @classmethod
+    def from_mono(cls, coef, mono):
+        ''' makes a term directly from a coefficient and a canonical monomial tuple (no parsing or copying) '''
+        t = object.__new__(cls)
+        t.coef = coef
+        t.mono = mono if coef != 0 else ()
+        return t
+
+    def __reduce__(self):
+        ''' pickles the coefficient and the monomial tuple '''
+        return (type(self).from_mono, (self.coef, self.mono))
+
     #def __del__(self, arg): N/A
 
     def __repr__(self):
@@ -80,8 +263,9 @@ class term:
         s = ('- ' if self.coef < 0 else '') + (str(abs(self.coef)) if abs(self.coef) != 1 else '')
 
         # variables
-        for v in self.degree:
-            s += v + (('^'+str(self.degree[v])) if self.degree[v] != 1 else '')
+        m = self.mono
+        for i in range(0, len(m), 2):
+            s += m[i] + (('^'+str(m[i+1])) if m[i+1] != 1 else '')
         return s
         
         
@@ -91,28 +275,27 @@ class term:
 
     def __eq__(self, t):
         ''' == operator '''
-     #   return self.__cmp_split() == t.__cmp_split()
-        return (tuple(self.degree.items()), self.coef) == (tuple(self.degree.items()), self.coef)
+        return (self.mono, self.coef) == (t.mono, t.coef)
 
     def __ne__(self, t):
         ''' != operator'''
-        return (tuple(self.degree.items()), self.coef) != (tuple(self.degree.items()), self.coef)
+        return (self.mono, self.coef) != (t.mono, t.coef)
 
     def __lt__(self, t):
         ''' < operator, compares first variables, then degrees and then by coefficient '''
-        return (tuple(self.degree.items()), self.coef) < (tuple(self.degree.items()), self.coef)
+        return (self.mono, self.coef) < (t.mono, t.coef)
 
     def __le__(self, t):
         ''' <= operator '''
-        return (tuple(self.degree.items()), self.coef) <= (tuple(self.degree.items()), self.coef)
+        return (self.mono, self.coef) <= (t.mono, t.coef)
 
     def __gt__(self, t):
         ''' > operator '''
-        return (tuple(self.degree.items()), self.coef) > (tuple(self.degree.items()), self.coef)
+        return (self.mono, self.coef) > (t.mono, t.coef)
 
     def __ge__(self, t):
         ''' >= operator '''
-        return (tuple(self.degree.items()), self.coef) >= (tuple(self.degree.items()), self.coef)
+        return (self.mono, self.coef) >= (t.mono, t.coef)
 
     def __nonzero__(self):
         ''' False if term is 0, True otherwise '''
@@ -127,16 +310,12 @@ class term:
         ''' evaluate term at values specified in dictionary,
          e.g. dict = {'x':3, 'y': 4} avaluates the polynomial at x=3, y=4.'''
         
-        t = term(self)
-        for v in d:
-            if v in t.degree:
-                t *= d[v] ** t.degree[v]
-                del t.degree[v]
-
-        if isinstance(self.coef, int) and all(isinstance(e, int) for e in d.values()) and all(abs(e) == 1 for e in d.values()):
-            t.coef = int(round(t.coef)) # make int
-        t.canonical()
-        return t
+        coef, m = self.coef, []
+        for i in range(0, len(self.mono), 2):
+            v, e = self.mono[i], self.mono[i+1]
+            if v in d: coef *= exact_pow(d[v], e)
+            else: m += (v, e)
+        return term.from_mono(coef, tuple(m))
             
     # Container emulator
 
@@ -158,24 +337,24 @@ class term:
     # Binary arithemrics
 
     def __add__(self, other):
-        t = term(self)
+        t = type(self)(self)
         t += other
         return t
 
     def __sub__(self, other):
-        t = term(self)
+        t = type(self)(self)
         t -= other
         return t
         
     def __mul__(self, t):
         ''' * operator '''
-        new_t = term(self)
+        new_t = type(self)(self)
         new_t *= t
         return new_t
     
     def __pow__(self, exponent):
         ''' ** operator '''
-        new_t = term(self)
+        new_t = type(self)(self)
         new_t **= exponent
         return new_t
         
@@ -183,7 +362,7 @@ class term:
      
     def __floordiv__(self, t):
         ''' / operator '''
-        new_t = term(self)
+        new_t = type(self)(self)
         new_t //= t
         return new_t
 
@@ -199,7 +378,7 @@ class term:
     
     def __xor__(self, t):
         ''' ^ operator, True if term similar (ie. degrees match), False otherwise '''
-        return self.degree == t.degree
+        return self.mono == t.mono
     
     #def __or__(self, arg): N/A
     
@@ -246,8 +425,7 @@ class term:
             
         elif isinstance(other, term):
             self.coef *= other.coef
-            for v in other.degree:
-                self.degree[v] = (self.degree[v] + other.degree[v]) if v in self.degree else other.degree[v]
+            self.mono = mono_mul(self.mono, other.mono)
 
         else:
             raise ValueError('Multiplication of term by unsupported type.')
@@ -259,8 +437,7 @@ class term:
     def __ipow__(self, exponent):
         ''' **= operator '''
         self.coef **= exponent
-        for v in self.degree:
-            self.degree[v] += exponent
+        self.mono = mono_pow(self.mono, exponent)
         self.canonical()
         return self
 
@@ -273,8 +450,7 @@ class term:
             
         elif isinstance(other, term):
             self.coef //= other.coef
-            for v in other.degree:
-                self.degree[v] = (self.degree[v] - other.degree[v]) if v in self.degree else -other.degree[v]
+            self.mono = mono_mul(self.mono, mono_inv(other.mono))
 
         else:
             raise ValueError('Division of term by unsupported type.')
@@ -298,26 +474,19 @@ class term:
 
     def __neg__(self):
         ''' negate, - unary operator '''
-        new_t = term(self)
-        new_t.coef = -new_t.coef
-        return new_t
+        return self.from_mono(-self.coef, self.mono)
 
     def __pos__(self):
         ''' + unary operator (returns a copy) '''
-        return term(self)
+        return type(self)(self)
 
     def __abs__(self):
         ''' turns all coefficient to their absolute value '''
-        new_t = term(self)
-        new_t.coef = abs(new_t.coef)
-        return new_t
+        return self.from_mono(abs(self.coef), self.mono)
         
     def __invert__(self):
         ''' ~, raplaces each var v with v^-1 '''
-        new_t = term(self)
-        for v in new_t.degree:
-            new_t.degree[v] *= -1
-        return new_t
+        return self.from_mono(self.coef, mono_inv(self.mono))
         
     # Conversion
 
@@ -354,25 +523,27 @@ class term:
     #def __get__(self, arg): N/A
     #def __set__(self, arg): N/A
     #def __delete__(self, arg): N/A
-    #def __slots__(self, arg): N/A
     
     # Custom methods
     
     def canonical(self):
-        '''puts in canonical form: if zero coeff, zero out term as well, remove variables with power 0'''
+        '''puts in canonical form: if zero coeff, zero out term as well (monomials never hold power 0)'''
 
-        if self.coef == 0: self.degree = {}
-        self.degree = {v: exponent for v, exponent in sorted(self.degree.items()) if exponent != 0}
+        if self.coef == 0: self.mono = ()
+
+    @property
+    def degree(self):
+        ''' read-only dictionary of variables and their degrees, built from the monomial tuple '''
+        return types.MappingProxyType(dict(zip(self.mono[::2], self.mono[1::2])))
 
     # Custom methods (Queries)
     
     def intQ(self):
         ''' True if the term an integer, False othwerwise '''
-        return all(v == 0 for v in self.degree)
+        return not self.mono
     
     def zeroQ(self):
         ''' True if the term is 0, False othwerwise '''
-      #  print("test(",self.coef,self.coef == 0,")")
         return self.coef == 0
     
     def oneQ(self):
@@ -385,8 +556,757 @@ class term:
 
 
 
+class frozenterm(term):
+    '''immutable, hashable term, operators return new frozen terms (e.g. t += s rebinds t)'''
+
+    __slots__ = ('_hash',)
+
+    def __init__(self, s = None, parent = None):
+        ''' same arguments as term '''
+        term.__init__(self, s, parent)
+        object.__setattr__(self, '_hash', hash((self.mono, self.coef)))
+
+    @classmethod
+    def from_mono(cls, coef, mono):
+        ''' makes a frozen term from a coefficient and a canonical monomial tuple '''
+        t = super().from_mono(coef, mono)
+        object.__setattr__(t, '_hash', hash((t.mono, t.coef)))
+        return t
+
+    def __setattr__(self, name, value):
+        if hasattr(self, '_hash'): raise AttributeError('frozenterm is immutable.')
+        object.__setattr__(self, name, value)
+
+    def __hash__(self):
+        return self._hash
+
+    def __reduce__(self):
+        return (frozenterm.from_mono, (self.coef, self.mono))
+
+    # Arithmeric assignment (returns a new term)
+
+    def __iadd__(self, other):
+        t = term(self)
+        t += other
+        return self.from_mono(t.coef, t.mono)
+
+    def __isub__(self, other):
+        t = term(self)
+        t -= other
+        return self.from_mono(t.coef, t.mono)
+
+    def __imul__(self, other):
+        t = term(self)
+        t *= other
+        return self.from_mono(t.coef, t.mono)
+
+    def __ipow__(self, exponent):
+        t = term(self)
+        t **= exponent
+        return self.from_mono(t.coef, t.mono)
+
+    def __ifloordiv__(self, other):
+        t = term(self)
+        t //= other
+        return self.from_mono(t.coef, t.mono)
+
+    def canonical(self):
+        ''' frozen terms are canonical from construction on '''
+        if not hasattr(self, '_hash'): term.canonical(self)
+
+
+# Multiplication engines, they work on coefficient dictionaries (monomial -> coefficient, see laurent.coefs)
+
+def kronecker_keys(*polys):
+    ''' Kronecker substitution for the product of coefficient dictionaries polys with integer exponents.
+    Exponent vectors (variables in sorted order) are shifted to start at 0 and packed into one integer,
+    first variable as the most significant digit, so keys of factors add up to the key of their product
+    and compare like exponent vectors in lex order.
+    Returns (list of key lists, one per poly, function key of a product -> monomial, number of possible keys),
+    or None if some exponent is not an integer. '''
+
+    vs = sorted({v for coefs in polys for m in coefs for v in m[::2]})
+    index = {v: i for i, v in enumerate(vs)}
+    mins = [[0] * len(vs) for _ in polys]
+    maxs = [[0] * len(vs) for _ in polys]
+    for lo, hi, coefs in zip(mins, maxs, polys):
+        for m in coefs:
+            for i in range(0, len(m), 2):
+                e, k = m[i+1], index[m[i]]
+                if not isinstance(e, int): return None
+                if e < lo[k]: lo[k] = e
+                elif e > hi[k]: hi[k] = e
+
+    low = [sum(lo[k] for lo in mins) for k in range(len(vs))] # minimal degrees of the product
+    weights, size = [0] * len(vs), 1
+    for k in reversed(range(len(vs))):
+        weights[k] = size
+        size *= sum(hi[k] for hi in maxs) - low[k] + 1
+
+    keys = []
+    for lo, coefs in zip(mins, polys):
+        base = -sum(e * w for e, w in zip(lo, weights))
+        keys.append([base + sum(m[i+1] * weights[index[m[i]]] for i in range(0, len(m), 2)) for m in coefs])
+
+    def unpack(key):
+        m = []
+        for v, w, l in zip(vs, weights, low):
+            d, key = divmod(key, w)
+            if d + l != 0: m += (v, d + l)
+        return tuple(m)
+
+    return keys, unpack, size
+
+def exponent_vectors(*polys):
+    ''' like kronecker_keys, but keys are exponent vectors (tuples), works for any exponents '''
+
+    vs = sorted({v for coefs in polys for m in coefs for v in m[::2]})
+    index = {v: i for i, v in enumerate(vs)}
+    keys = []
+    for coefs in polys:
+        keys.append([])
+        for m in coefs:
+            vec = [0] * len(vs)
+            for i in range(0, len(m), 2): vec[index[m[i]]] = m[i+1]
+            keys[-1].append(tuple(vec))
+
+    def unpack(key):
+        return tuple(x for v, e in zip(vs, key) if e != 0 for x in (v, e))
+
+    return keys, unpack
+
+def mul_naive(a, b):
+    ''' product of coefficient dictionaries a and b, accumulates every pairwise product in a dictionary '''
+    coefs = {}
+    for m0, c0 in a.items():
+        for m1, c1 in b.items():
+            m = mono_mul(m0, m1)
+            coefs[m] = coefs.get(m, 0) + c0 * c1
+    return {m: c for m, c in coefs.items() if c != 0}
+
+def mul_heap(a, b):
+    ''' product of coefficient dictionaries a and b by Johnson's heap method (see heap_product).
+    The resulting dictionary is in lex order of exponent vectors (not the printed order). '''
+
+    if len(a) > len(b): a, b = b, a
+    if not a: return {}
+    (A, B), add, unpack = sorted_keys(a, b)
+    return {unpack(k): c for k, c in heap_product(A, B, add).items()}
+
+def sorted_keys(a, b):
+    ''' the terms of coefficient dictionaries a and b as lists of (key, coefficient) sorted by key, where keys are
+    packed exponents (see kronecker_keys) or exponent vectors, the function adding keys and the one unpacking them '''
+    packed = kronecker_keys(a, b)
+    if packed is None:
+        (ka, kb), unpack = exponent_vectors(a, b)
+        add = add_vectors
+    else:
+        (ka, kb), unpack, _ = packed
+        add = operator.add
+    return (sorted(zip(ka, a.values())), sorted(zip(kb, b.values()))), add, unpack
+
+def add_vectors(k0, k1):
+    ''' sum of exponent vectors k0 and k1 '''
+    return tuple(map(operator.add, k0, k1))
+
+def heap_product(A, B, add):
+    ''' Johnson's heap method on lists A and B of (key, coefficient) sorted by key: the heap holds one pending
+    product per term of A, products leave the heap in key order and like terms are added as they come out,
+    so memory is O(len(A) + output). Returns a dictionary key -> coefficient in key order. '''
+
+    nA, nB = len(A), len(B)
+    kb0 = B[0][0]
+
+    heap = [(add(A[0][0], kb0), 0, 0)]
+    result, key, coef = {}, None, 0
+    while heap:
+        k, i, j = heap[0]
+        c = A[i][1] * B[j][1]
+        if j + 1 < nB:
+            heapq.heapreplace(heap, (add(A[i][0], B[j+1][0]), i, j + 1))
+        else:
+            heapq.heappop(heap)
+        if j == 0 and i + 1 < nA:
+            heapq.heappush(heap, (add(A[i+1][0], kb0), i + 1, 0))
+
+        if k == key:
+            coef += c
+        else:
+            if coef != 0: result[key] = coef
+            key, coef = k, c
+
+    if coef != 0: result[key] = coef
+    return result
+
+def integral(p):
+    ''' True if the coefficients of polynomial p are integers '''
+    return all(type(c) is int for c in p.coefs.values())
+
+def nonzero_box(ranges):
+    ''' box (see laurent.box) of (variable, (min, max)) pairs, without variables of degree range (0, 0), which do
+    not occur (e.g. x in x * x^-1) '''
+    return {v: r for v, r in ranges if r != (0, 0)}
+
+def convex_hull(points):
+    ''' vertices of the convex hull of sorted, distinct points in the plane, counterclockwise from the first
+    (Andrew's monotone chain) '''
+    if len(points) <= 2: return list(points)
+
+    def cross(o, a, b):
+        return (a[0] - o[0]) * (b[1] - o[1]) - (a[1] - o[1]) * (b[0] - o[0])
+
+    lower, upper = [], []
+    for p in points:
+        while len(lower) >= 2 and cross(lower[-2], lower[-1], p) <= 0: lower.pop()
+        lower.append(p)
+    for p in reversed(points):
+        while len(upper) >= 2 and cross(upper[-2], upper[-1], p) <= 0: upper.pop()
+        upper.append(p)
+    return lower[:-1] + upper[:-1]
+
+def box_density(coefs):
+    ''' number of terms divided by the number of monomials in the exponent bounding box of the polynomial,
+    0 if some exponent is not an integer '''
+    lo, hi = defaultdict(int), defaultdict(int)
+    for m in coefs:
+        for i in range(0, len(m), 2):
+            v, e = m[i], m[i+1]
+            if not isinstance(e, int): return 0
+            if e < lo[v]: lo[v] = e
+            elif e > hi[v]: hi[v] = e
+    box = 1
+    for v in hi.keys() | lo.keys(): box *= hi[v] - lo[v] + 1
+    return len(coefs) / box
+
+def convolve_int(A, B):
+    ''' exact convolution of integer lists A and B by Kronecker substitution into Python integers:
+    each list is packed into one big integer with fixed-width slots, the integers are multiplied and the
+    slots of the product are read back (signed values are biased by half a slot so no slot borrows) '''
+    bound = max(map(abs, A)) * max(map(abs, B)) * min(len(A), len(B))
+    k = (bound.bit_length() + 9) // 8 # bytes per slot, |value| < half a slot
+    half = 1 << (8 * k - 1)
+    half_bytes = half.to_bytes(k, 'little')
+
+    def pack(X):
+        biased = int.from_bytes(b''.join((x + half).to_bytes(k, 'little') for x in X), 'little')
+        return biased - int.from_bytes(half_bytes * len(X), 'little')
+
+    n = len(A) + len(B) - 1
+    C = pack(A) * pack(B) + int.from_bytes(half_bytes * n, 'little')
+    C = C.to_bytes(k * n, 'little')
+    return [int.from_bytes(C[i:i+k], 'little') - half for i in range(0, k * n, k)]
+
+def mul_dense(a, b):
+    ''' product of coefficient dictionaries a and b by Kronecker substitution (see kronecker_keys):
+    the polynomials become dense coefficient arrays indexed by their packed exponents, which are convolved.
+    Integer coefficients are multiplied exactly (NumPy int64 if it cannot overflow, otherwise Python
+    integers, see convolve_int), float coefficients by NumPy convolution or FFT.
+    Falls back to mul_heap for fractional exponents, mixed int/float coefficients or floats without NumPy. '''
+
+    if not a or not b: return {}
+    packed = kronecker_keys(a, b)
+    ints = all(type(c) is int for c in a.values()) and all(type(c) is int for c in b.values())
+    floats = not ints and all(type(c) is float for c in a.values()) and all(type(c) is float for c in b.values())
+    if packed is None or not (ints or floats and np is not None):
+        return mul_heap(a, b)
+    (ka, kb), unpack, _ = packed
+
+    A, B = [0] * (max(ka) + 1), [0] * (max(kb) + 1)
+    for k, c in zip(ka, a.values()): A[k] = c
+    for k, c in zip(kb, b.values()): B[k] = c
+
+    if ints and (np is None or len(A) * len(B) > 1 << 24 or
+                 max(map(abs, a.values())) * max(map(abs, b.values())) * min(len(a), len(b)) >= 1 << 62):
+        C = convolve_int(A, B)
+        return {unpack(k): c for k, c in enumerate(C) if c != 0}
+
+    dtype = np.int64 if ints else np.float64
+    A, B = np.array(A, dtype = dtype), np.array(B, dtype = dtype)
+    if ints or len(A) * len(B) <= 1 << 22:
+        C = np.convolve(A, B)
+    else:
+        n = len(A) + len(B) - 1
+        size = 1 << (n - 1).bit_length()
+        def fft_convolve(X, Y):
+            return np.fft.irfft(np.fft.rfft(X, size) * np.fft.rfft(Y, size), size)[:n]
+        C, support = fft_convolve(A, B), fft_convolve(A != 0, B != 0) > 0.5
+        # FFT leaves rounding noise at keys no pair of terms lands on, and instead of exact cancellations
+        C[~support | (np.abs(C) <= 1e-13 * np.abs(A).max() * np.abs(B).max() * min(len(a), len(b)))] = 0
+
+    keys = np.flatnonzero(C)
+    return {unpack(k): c for k, c in zip(keys.tolist(), C[keys].tolist())}
+
+
+def mul_dense_mod(a, b, modulus):
+    ''' product of coefficient dictionaries a and b with integer coefficients modulo a prime below 2^31, by
+    Kronecker substitution and NumPy int64 convolutions: coefficients are split into 16 bit halves, so no
+    convolution overflows, and the four partial products are recombined modulo the prime.
+    Falls back to mul_heap (coefficients not reduced) for fractional exponents or without NumPy. '''
+
+    if not a or not b: return {}
+    packed = kronecker_keys(a, b)
+    if packed is None or np is None or modulus >= 1 << 31: return mul_heap(a, b)
+    (ka, kb), unpack, _ = packed
+
+    A, B = np.zeros(max(ka) + 1, dtype = np.int64), np.zeros(max(kb) + 1, dtype = np.int64)
+    A[ka], B[kb] = [c % modulus for c in a.values()], [c % modulus for c in b.values()]
+    A0, A1, B0, B1 = A & 0xFFFF, A >> 16, B & 0xFFFF, B >> 16
+    C = (np.convolve(A1, B1) % modulus) * ((1 << 32) % modulus) % modulus
+    C += (np.convolve(A0, B1) + np.convolve(A1, B0)) % modulus * ((1 << 16) % modulus) % modulus
+    C += np.convolve(A0, B0) % modulus
+    C %= modulus
+
+    keys = np.flatnonzero(C)
+    return {unpack(k): c for k, c in zip(keys.tolist(), C[keys].tolist())}
+
+
+process_pool = None # ProcessPoolExecutor used by mul_parallel and multimodular, created on first use
+process_pool_workers = 0
+
+def get_process_pool(workers):
+    ''' the shared process pool, (re)created with the given number of workers '''
+    global process_pool, process_pool_workers
+    if process_pool_workers != workers:
+        if process_pool is not None: process_pool.shutdown()
+        process_pool, process_pool_workers = concurrent.futures.ProcessPoolExecutor(workers), workers
+    return process_pool
+
+def mul_chunk(A, B, add):
+    ''' worker of mul_parallel: heap_product of its chunk A and B, as lists of keys and coefficients '''
+    c = heap_product(A, B, add)
+    return list(c), list(c.values())
+
+def mul_parallel(a, b, workers = None):
+    ''' product of coefficient dictionaries a and b in a process pool of workers processes (os.cpu_count() by
+    default): the smaller factor is split into a chunk per worker, each worker multiplies its chunk by the other
+    factor (see heap_product) and the partial products, sorted by packed exponents, are added by a k-way merge '''
+    if len(a) > len(b): a, b = b, a
+    workers = min(workers or os.cpu_count() or 1, len(a))
+    if workers <= 1: return mul_heap(a, b)
+
+    (A, B), add, unpack = sorted_keys(a, b)
+    size = -(-len(A) // workers)
+    pool = get_process_pool(workers)
+    futures = [pool.submit(mul_chunk, A[i : i + size], B, add) for i in range(0, len(A), size)]
+    parts = [zip(*f.result()) for f in futures]
+
+    result, key, coef = {}, None, 0
+    for k, c in heapq.merge(*parts, key = operator.itemgetter(0)):
+        if k == key:
+            coef += c
+        else:
+            if coef != 0: result[unpack(key)] = coef
+            key, coef = k, c
+    if coef != 0: result[unpack(key)] = coef
+    return result
+
+def pow_multinomial(coefs, n):
+    ''' n-th power of a polynomial with few terms by the multinomial theorem, only the
+    (n + len - 1 choose len - 1) products of term powers are formed '''
+    items = list(coefs.items())
+    powers = [] # powers[j][k] = (c_j^k, m_j^k)
+    for m, c in items:
+        powers.append([(c ** k, mono_pow(m, k)) for k in range(n + 1)])
+
+    result = {}
+    def expand(j, left, coef, mono):
+        if j == len(items) - 1:
+            c, m = powers[j][left]
+            m = mono_mul(mono, m)
+            result[m] = result.get(m, 0) + coef * c
+            return
+        binomial = 1 # (left choose k)
+        for k in range(left + 1):
+            c, m = powers[j][k]
+            expand(j + 1, left - k, coef * binomial * c, mono_mul(mono, m))
+            binomial = binomial * (left - k) // (k + 1)
+
+    expand(0, n, 1, ())
+    return {m: c for m, c in result.items() if c != 0}
+
+
+# Division, on coefficient dictionaries as well
+
+def div_print(a, b):
+    ''' division of coefficient dictionaries a by b in printed order (the original divmod of laurent): for len(a)
+    steps the first term of the remainder in printed order is divided (floor division of coefficients) by the
+    first term of b. The remainder is changed in place and its first term is found with a lazy heap of monomials.
+    Returns (quotient, remainder) dictionaries. '''
+
+    q, r = {}, dict(a)
+    heap = list(r)
+    heapq.heapify(heap)
+    lead = min(b)
+    lead_inv, lead_coef = mono_inv(lead), b[lead]
+    for _ in range(len(a)):
+        while heap[0] not in r: heapq.heappop(heap) # monomials cancelled meanwhile
+        m = heap[0]
+        c = r[m] // lead_coef
+        if c == 0: break # further steps would not change anything
+        t = mono_mul(m, lead_inv)
+        q[t] = q.get(t, 0) + c
+        if q[t] == 0: del q[t]
+        for mb, cb in b.items():
+            mm = mono_mul(t, mb)
+            coef = r.get(mm, 0) - c * cb
+            if coef != 0:
+                if mm not in r: heapq.heappush(heap, mm)
+                r[mm] = coef
+            elif mm in r:
+                del r[mm]
+        if not r: break
+    return q, r
+
+# monomial orders as linear maps of exponent vectors (variables in sorted order) to keys, smaller keys are larger
+# monomials, so the keys of a product are the sums of keys and a heap gives the largest monomials first
+order_keys = {
+    'lex': lambda e: tuple([-x for x in e]),
+    'grlex': lambda e: (-sum(e),) + tuple([-x for x in e]),
+    'grevlex': lambda e: (-sum(e),) + e[::-1],
+}
+
+def coef_div(c, d):
+    ''' c / d, exact for integers (None if d does not divide c) '''
+    if isinstance(c, int) and isinstance(d, int):
+        return c // d if c % d == 0 else None
+    return c / d
+
+def div_heap(a, b, order = 'grevlex', exact = False, floor = None, weights = None):
+    ''' division of coefficient dictionaries a by b with integer exponents by the heap method of Monagan and Pearce:
+    the products of quotient terms and b are merged from a heap in the monomial order ('lex', 'grlex' or 'grevlex',
+    see order_keys), so each term of the quotient and of the remainder is produced once, largest first.
+    Negative exponents are shifted away by monomials (units) first, so the division terminates.
+    Terms not divisible by the leading term of b (also integer coefficients not divisible by its coefficient) go to
+    the remainder, with exact the division raises ValueError on the first of them instead.
+    With floor, monomials are compared by their weighted degree first (weights: variable -> weight, all 1 if None)
+    and the division stops when no further quotient or remainder term can have a weighted degree >= floor, so
+    only the terms of these degrees are returned (those are the same as without floor).
+    Returns (quotient, remainder) dictionaries. '''
+
+    vectors, unpack = exponent_vectors(a, b)
+    va, vb = vectors
+    if any(not isinstance(x, int) for v in va + vb for x in v):
+        raise ValueError('Division in a monomial order needs integer exponents.')
+    n = len(va[0]) if va else 0
+    # exact quotients have the difference of the smallest degrees as their smallest degrees, so the shifted
+    # quotient is an ordinary polynomial; otherwise only negative exponents are shifted
+    low_a = [min(0, *col) if not exact else min(col) for col in zip(*va)] if n else []
+    low_b = [min(0, *col) if not exact else min(col) for col in zip(*vb)] if n else []
+    key = order_keys[order]
+    if floor is not None:
+        variables = sorted({v for coefs in (a, b) for m in coefs for v in m[::2]})
+        w = [1 if weights is None else weights.get(v, 0) for v in variables]
+        weighted = lambda e: sum(map(operator.mul, w, e))
+        key = lambda e, order_key = key: (-weighted(e),) + order_key(e)
+
+    def normal(vs, low, coefs): # terms (key, shifted exponents, coefficient) sorted largest first
+        terms = []
+        for v, c in zip(vs, coefs):
+            e = tuple(map(operator.sub, v, low))
+            terms.append((key(e), e, c))
+        return sorted(terms)
+    F, G = normal(va, low_a, a.values()), normal(vb, low_b, b.values())
+    add, sub = add_vectors, lambda k0, k1: tuple(map(operator.sub, k0, k1))
+    g_key, g_exp, g_coef = G[0]
+
+    if exact: # the degree ranges of the quotient, from the largest and the smallest degrees, must not be empty
+        ranges = [(max(ca) - max(cb), min(ca) - min(cb)) for ca, cb in zip(zip(*va), zip(*vb))]
+        if any(high < low for high, low in ranges):
+            raise ValueError('Polynomial is not divisible.')
+
+    if floor is not None: # smallest shifted weighted degree of a dividend term giving a quotient or remainder term >= floor
+        floor -= weighted(low_a) - min(0, weighted(g_exp) + weighted(low_b))
+
+    Q, R, heap, k = [], [], [], 0
+    while k < len(F) or heap:
+        K = heap[0][0] if heap and (k == len(F) or heap[0][0] <= F[k][0]) else F[k][0]
+        if floor is not None and -K[0] < floor: break
+        e, coef = None, 0
+        if k < len(F) and F[k][0] == K:
+            _, e, coef = F[k]
+            k += 1
+        while heap and heap[0][0] == K:
+            _, i, j = heap[0]
+            coef -= Q[i][2] * G[j][2]
+            if e is None: e = add(Q[i][1], G[j][1])
+            if j + 1 < len(G):
+                heapq.heapreplace(heap, (add(Q[i][0], G[j+1][0]), i, j + 1))
+            else:
+                heapq.heappop(heap)
+        if coef == 0: continue
+
+        c = coef_div(coef, g_coef) if all(map(operator.ge, e, g_exp)) else None
+        if c is None:
+            if exact: raise ValueError('Polynomial is not divisible.')
+            R.append((e, coef))
+        else:
+            Q.append((sub(K, g_key), sub(e, g_exp), c))
+            if len(G) > 1: heapq.heappush(heap, (add(Q[-1][0], G[1][0]), len(Q) - 1, 1))
+
+    shift = tuple(map(operator.sub, low_a, low_b))
+    q = {unpack(add(e, shift)): c for _, e, c in Q}
+    r = {unpack(add(e, low_a)): c for e, c in R}
+    return q, r
+
+
+# Truncated arithmetic: windows of degrees are lists of (variable, low, high), variable None for the total degree,
+# None for an open end (see degree_window)
+
+def degree_window(bounds = None, degree = None):
+    ''' the window of bounds (dictionary variable -> (low, high)) and degree ((low, high) of the total degree) '''
+    window = [(v, lo, hi) for v, (lo, hi) in (bounds or {}).items()]
+    if degree is not None: window.append((None, degree[0], degree[1]))
+    return window
+
+def window_degree(v):
+    ''' function of a monomial giving its degree in variable v (the total degree if v is None) '''
+    return (lambda m: sum(m[1::2])) if v is None else (lambda m: var_degree(m, v))
+
+def in_window(coefs, window):
+    ''' the terms of coefficient dictionary coefs with degrees in window '''
+    degrees = [(window_degree(v), lo, hi) for v, lo, hi in window]
+    return {m: c for m, c in coefs.items()
+            if all((lo is None or f(m) >= lo) and (hi is None or f(m) <= hi) for f, lo, hi in degrees)}
+
+def narrowest(window):
+    ''' the bounds of window, the narrowest first '''
+    return sorted(window, key = lambda w: math.inf if w[1] is None or w[2] is None else w[2] - w[1])
+
+def mul_window(a, b, window):
+    ''' the terms of the product of coefficient dictionaries a and b with degrees in window. The terms of the larger
+    factor are sorted by their degree for the narrowest bound, each term of the other one multiplies only those which
+    land in that bound (found by bisection) and pass the other bounds, so pairs out of the window are never multiplied '''
+    if len(a) > len(b): a, b = b, a
+    if not a: return {}
+    window = narrowest(window)
+    fs = [window_degree(v) for v, _, _ in window]
+    lows = [-math.inf if lo is None else lo for _, lo, _ in window]
+    highs = [math.inf if hi is None else hi for _, _, hi in window]
+
+    B = sorted(((tuple(f(m) for f in fs), m, c) for m, c in b.items()), key = lambda t: t[0][0])
+    first = [k[0] for k, _, _ in B]
+    rest = range(1, len(window))
+    coefs = {}
+    get = coefs.get
+    for ma, ca in a.items():
+        ka = [f(ma) for f in fs]
+        start, stop = bisect.bisect_left(first, lows[0] - ka[0]), bisect.bisect_right(first, highs[0] - ka[0])
+        for i in range(start, stop):
+            kb, mb, cb = B[i]
+            if all(lows[j] <= ka[j] + kb[j] <= highs[j] for j in rest):
+                m = mono_mul(ma, mb)
+                coefs[m] = get(m, 0) + ca * cb
+    return {m: c for m, c in coefs.items() if c != 0}
+
+def mul_slices(a, b, window, mul):
+    ''' like mul_window for dense factors: a is cut into blocks of degrees (for the narrowest bound) as wide as the bound,
+    each block is multiplied by mul (a function of two coefficient dictionaries, e.g. a fast engine) with the terms
+    of b in the degrees landing in the bound, the other bounds are applied to the result. If that would not skip
+    most pairs of terms, mul(a, b) is truncated instead. '''
+    v, lo, hi = narrowest(window)[0]
+    if lo is None or hi is None: return in_window(mul(a, b), window)
+    if hi < lo: return {}
+    f = window_degree(v)
+    A, B = defaultdict(dict), defaultdict(dict)
+    for slices, coefs in ((A, a), (B, b)):
+        for m, c in coefs.items(): slices[f(m)][m] = c
+
+    width, start = hi - lo + 1, min(A)
+    blocks = []
+    while start <= max(A):
+        block = {m: c for i in range(start, start + width) if i in A for m, c in A[i].items()}
+        part = {m: c for j, s in B.items() if lo - (start + width - 1) <= j <= hi - start for m, c in s.items()}
+        if block and part: blocks.append((block, part))
+        start += width
+    if sum(len(x) * len(y) for x, y in blocks) * 2 > len(a) * len(b): # little to skip
+        return in_window(mul(a, b), window)
+
+    coefs = {}
+    for block, part in blocks:
+        add_scaled(coefs, in_window(mul(block, part), [(v, lo, hi)]), 1)
+    return in_window({m: c for m, c in coefs.items() if c != 0}, window)
+
+# Greatest common divisors of polynomials (laurent objects) with integer coefficients and integer exponents in the
+# variables listed. Monomials are units of Laurent polynomials, so divisors are normalized (see laurent.normalize) and
+# divisibility is checked by exact division of Laurent polynomials; the sign of the result is arbitrary.
+
+def int_content(coefs):
+    ''' gcd of the integer coefficients in dictionary coefs '''
+    g = 0
+    for c in coefs.values():
+        g = math.gcd(g, c)
+        if g == 1: break
+    return g
+
+def lex_leading(coefs):
+    ''' the largest monomial of coefficient dictionary coefs in lex order '''
+    (vectors,), _ = exponent_vectors(coefs)
+    return max(zip(vectors, coefs))[1]
+
+def scale_div(p, k):
+    ''' polynomial p with its (integer) coefficients divided by k exactly '''
+    return p.from_coefs({m: c // k for m, c in p.coefs.items()})
+
+def var_degree(m, v):
+    ''' exponent of variable v in monomial m '''
+    for i in range(0, len(m), 2):
+        if m[i] == v: return m[i+1]
+    return 0
+
+def var_coefficient(p, v, k):
+    ''' coefficient of v^k in p, a polynomial in the other variables '''
+    return p.from_coefs({tuple(x for i in range(0, len(m), 2) if m[i] != v for x in m[i:i+2]): c
+                         for m, c in p.coefs.items() if var_degree(m, v) == k})
+
+def gcd_poly(f, g, variables):
+    ''' gcd of polynomials f and g, by the heuristic gcd (see gcd_heuristic), falling back to primitive
+    polynomial remainder sequences (see gcd_prs) '''
+    if f.zeroQ(): return g.normalize()
+    if g.zeroQ(): return f.normalize()
+    if not variables: return type(f)(math.gcd(f.coefs[()], g.coefs[()]))
+    h = gcd_heuristic(f, g, variables)
+    return h if h is not None else gcd_prs(f, g, variables)
+
+def gcd_heuristic(f, g, variables, attempts = 6):
+    ''' heuristic gcd (GCDHEU of Char, Geddes and Gonnet) of polynomials f and g (no negative exponents): the first
+    variable is replaced by an integer x > 2 min(|f|, |g|) + 1, the gcd of the images (recursively, integers in the
+    end, never normalized, so no factor is lost) is expanded in base x with symmetric digits and its primitive part
+    is the gcd if it divides f and g with polynomial quotients (checked by exact division). Returns None if all
+    attempts fail. '''
+
+    if f.zeroQ() or g.zeroQ() or not variables: return gcd_poly(f, g, variables)
+    c = math.gcd(int_content(f.coefs), int_content(g.coefs))
+    f, g = scale_div(f, c), scale_div(g, c)
+
+    v = variables[0]
+    norm_f, norm_g = max(map(abs, f.coefs.values())), max(map(abs, g.coefs.values()))
+    lead_f, lead_g = abs(f.coefs[max(f.coefs, key = lambda m: var_degree(m, v))]), abs(g.coefs[max(g.coefs, key = lambda m: var_degree(m, v))])
+    bound = 2 * min(norm_f, norm_g) + 29
+    x = max(min(bound, 99 * isqrt(bound)), 2 * min(norm_f // lead_f, norm_g // lead_g) + 2, 2 * min(norm_f, norm_g) + 2)
+
+    for _ in range(attempts):
+        ff, gg = f.substitute({v: x}), g.substitute({v: x})
+        h = gcd_heuristic(ff, gg, variables[1:], attempts) if not ff.zeroQ() and not gg.zeroQ() else None
+        if h is not None:
+            # digits of h in base x are the coefficients of the powers of v
+            coefs, i = {}, 0
+            while not h.zeroQ():
+                digits = {m: (c % x if c % x <= x // 2 else c % x - x) for m, c in h.coefs.items()}
+                for m, d in digits.items():
+                    if d != 0: coefs[mono_mul(m, (v, i)) if i else m] = d
+                h = h.from_coefs({m: (c - digits[m]) // x for m, c in h.coefs.items()})
+                i += 1
+            h = f.from_coefs(coefs)
+            h = scale_div(h, int_content(h.coefs))
+            if polynomial_quotient(f, h) and polynomial_quotient(g, h): return h * c
+        x = 73794 * x * isqrt(isqrt(x)) // 27011
+    return None
+
+def polynomial_quotient(f, h):
+    ''' True if h divides f with a quotient without negative exponents (so also as ordinary polynomials) '''
+    if h.zeroQ(): return False
+    try:
+        q = f.divide(h, exact = True)[0]
+    except ValueError:
+        return False
+    return all(e >= 0 for m in q.coefs for e in m[1::2])
+
+def gcd_prs(f, g, variables):
+    ''' gcd of polynomials f and g by primitive polynomial remainder sequences in the first variable,
+    the contents (polynomials in the other variables) by gcd_poly '''
+    if f.zeroQ() or g.zeroQ() or not variables: return gcd_poly(f, g, variables)
+    v, rest = variables[0], variables[1:]
+
+    def content(p):
+        c = f.from_coefs({})
+        for k in {var_degree(m, v) for m in p.coefs}:
+            c = gcd_poly(c, var_coefficient(p, v, k), rest)
+        return c
+
+    def primitive(p, c):
+        return p.divide(c, exact = True)[0].normalize() if not c.oneQ() else p.normalize()
+
+    def degree(p):
+        return max(var_degree(m, v) for m in p.coefs)
+
+    f, g = f.normalize(), g.normalize()
+    cf, cg = content(f), content(g)
+    f, g = primitive(f, cf), primitive(g, cg)
+    if degree(f) < degree(g): f, g = g, f
+    while not g.zeroQ():
+        # pseudo-remainder of f by g, f is multiplied by the leading coefficient of g as needed
+        d, lead_g, r = degree(g), var_coefficient(g, v, degree(g)), f
+        while not r.zeroQ() and degree(r) >= d:
+            k = degree(r)
+            r = r * lead_g - g * var_coefficient(r, v, k) * term.from_mono(1, (v, k - d) if k > d else ())
+        f, g = g, (primitive(r, content(r)) if not r.zeroQ() else r)
+    return primitive(f, content(f)) * gcd_poly(cf, cg, rest)
+
+
+def coef_types(p):
+    ''' the monomials of polynomial p with the types of their coefficients, so keys of equal polynomials
+    with int and float coefficients (1 == 1.0) differ '''
+    return frozenset((m, type(c)) for m, c in p.coefs.items())
+
+
+class lrucache:
+    '''bounded memo of least recently used results with hit/miss statistics, see laurent.op_cache'''
+
+    def __init__(self, maxsize = 1024):
+        ''' cache holding at most maxsize results '''
+        self.maxsize = maxsize
+        self.data = OrderedDict()
+        self.hits = self.misses = self.evictions = 0
+
+    def __repr__(self):
+        return 'lrucache(' + ', '.join('%s=%s' % item for item in self.info().items()) + ')'
+
+    def __len__(self):
+        return len(self.data)
+
+    def get(self, key):
+        ''' the value stored at key (marked as recently used) or None '''
+        value = self.data.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.data.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        ''' stores value at key, evicting the least recently used values above maxsize '''
+        self.data[key] = value
+        self.data.move_to_end(key)
+        while len(self.data) > self.maxsize:
+            self.data.popitem(last = False)
+            self.evictions += 1
+
+    def clear(self):
+        ''' forgets all values and statistics '''
+        self.data.clear()
+        self.hits = self.misses = self.evictions = 0
+
+    def info(self):
+        ''' dictionary of statistics '''
+        calls = self.hits + self.misses
+        return {'hits': self.hits, 'misses': self.misses, 'hit_rate': self.hits / calls if calls else 0.0,
+                'evictions': self.evictions, 'size': len(self.data), 'maxsize': self.maxsize}
+
+
 class laurent:
-    '''class representing a multivariate laurent polynomials, an ordered list of terms'''
+    '''class representing a multivariate laurent polynomials, a dictionary of monomials and their coefficients'''
+
+    mul_method = 'auto' # engine used by *, 'heap' (see mul_heap), 'dense' (see mul_dense), 'naive' (see mul_naive), 'parallel' (see mul_parallel) or 'auto'
+    mul_engines = {'heap': mul_heap, 'dense': mul_dense, 'naive': mul_naive, 'parallel': mul_parallel}
+    dense_threshold = 0.5 # 'auto' multiplies densely if both factors fill at least this part of their bounding box
+    mul_workers = None # 'auto' multiplies sparse products in this many processes (see mul_parallel), None is serial
+    parallel_threshold = 10 ** 7 # ... if the product has at least this many pairs of terms
+    op_cache = None # lrucache memoizing *, ** and divmod of polynomials (None disables it)
+    multinomial_terms = 3 # powers of polynomials with at most this many terms use pow_multinomial
+    cache_powers = False # keep computed powers on the polynomial (can also be set per polynomial)
+    div_order = 'print' # monomial order of divmod, 'print' (the original division, see div_print), 'lex', 'grlex' or 'grevlex'
+    modulus = None # coefficients are integers modulo this prime in modlaurent.over(modulus), None for laurent
     
     # Initialization, deletion, representation
     
@@ -395,45 +1315,37 @@ class laurent:
     def __init__(self, s = None):
         ''' initializes the multivariate laurent polynomial, argument may be either:
         a laurent polynomial (makes a copy),
+        a term,
         integer (makes poly with one 0 degrees term),
         string (of the form 'x+2y^3 -4y^-1 + z^(-3)y**5'),
         or empty (makes a polynomial without terms, ie. polynomial 0)
         In vars we should provide a list (or string) of variables used
         (otherwise they are extracted from the string).'''
 
-        # self.laurent_vars = {0: 'x'}
-        # self.laurent_vars_inverse = {'x': 0}
+        self.coefs = {} # monomial -> coefficient, zero coefficients are never stored
+        self._cache = {} # data derived from coefs (e.g. the sorted order), cleared on every change
 
         if isinstance(s, laurent):
             # make a copy
-            self.term = [ term(t) for t in s.term ]
+            self.coefs = dict(s.coefs)
         
         elif s == None:
-            self.term = []
+            pass
     
         elif isinstance(s, str):
+            self.coefs = parse(s) # accepts strings like 'x+2y^3 -4y^-1 + z^(-3)y**5'
 
-            #variable_list = sorted(set(re.sub(r'[^a-zA-Z]+','',s))) # set of variables usef in polynomial
-
-            ''' accepts strings like 'x+2y^3 -4y^-1 + z^(-3)y**5' '''
-            s = re_whitespace.sub('',s) # remove whitespace
-            s = re_star_star.sub('^',s) # replace ** -> ^
-            s = re_brackets.sub('',s) # remove brackets
-            s = re_insert_plus.sub('+',s) # put + in front if missing
-            s = re_insert_ones.sub('\g<1>1',s) # insert 1s in front of term starting with a variable
-            s = re_insert_carets.sub('\g<1>^1',s) # insert ^1's after variables
-            s = re_insert_whitespace.sub(' \g<1>',s) # insert whitespace between term
-            s = re_insert_star.sub('*\g<1>',s) # insert *'s between elements
-            s_split = re_whitespace.split(s) # split into a list of term
+        elif isinstance(s, term) or isinstance(s, int) or isinstance(s, float):
+            t = term(s)
+            self.add_term(t.mono, t.coef)
 
-            self.term = [ term(st) for st in s_split ]
-
-
-        elif isinstance(s, int) or isinstance(s, float):
-#            raise ValueError('Not yet supported.') #TODO: variable tables
-            self.term = [ term(s) ]
-
-        self.canonical()
+    @classmethod
+    def from_coefs(cls, coefs):
+        ''' makes a polynomial directly from a dictionary monomial -> coefficient (takes ownership, no copy) '''
+        p = cls()
+        p.coefs = coefs
+        p.canonical()
+        return p
 
     #def __del__(self, arg): N/A
 
@@ -449,7 +1361,9 @@ class laurent:
 
     def __eq__(self, p):
         ''' == operator '''
-        return len(self.term) == len(p.term) and all(t0 == t1 for t0,t1 in zip(self.term, p.term))
+        if isinstance(p, term) or isinstance(p, int) or isinstance(p, float): return self.coefs == laurent(p).coefs
+        if not isinstance(p, laurent): return NotImplemented
+        return self.modulus == p.modulus and self.coefs == p.coefs # other coefficient domains are never equal
 
         
     def __ne__(self, p):
@@ -484,16 +1398,16 @@ class laurent:
 
     def __call__(self, dic):
         ''' evaluates the polynomial at values specified in dictionary, e.g. {x:4, y:3} evaluates at x=4, y=3'''
-        p = laurent()
-        for t in self.term: p += t(dic)
-        p.canonical()
-        return p
+
+        if all(v in dic for m in self.coefs for v in m[::2]) and all(isinstance(x, (int, float)) for x in dic.values()):
+            return type(self)(self.evaluate(dic))
+        return self.substitute(dic)
 
     # Container emulator
 
     def __len__(self):
         ''' returns number of terms '''
-        return len(self.term)
+        return len(self.coefs)
 
     #def __getitem__(self, arg): N/A
     #def __missing__(self, arg): N/A
@@ -513,55 +1427,42 @@ class laurent:
 
     def __add__(self, p):
         ''' + operator '''
-        new_p = laurent(self) # make a copy
-        new_p += p
-        return new_p
+        if isinstance(p, lazy): return lazy(self) + p
+        self.check_modulus(p, 'Adding')
+        return laurent(self).add_terms(p) # a copy
 
     def __sub__(self, p):
         ''' - operator '''
-        new_p = laurent(self) # make a copy
-        new_p -= p
-        return new_p
+        if isinstance(p, lazy): return lazy(self) - p
+        self.check_modulus(p, 'Subtracting')
+        return laurent(self).add_terms(p, -1) # a copy
 
     def __mul__(self, p):
         ''' * operator '''
         
-        new_p = laurent()
+        if isinstance(p, lazy): return lazy(self) * p
 
-        if isinstance(p, laurent): # TODO: O(n ln(n))
-            new_p.term = [ t0 * t1 for t0 in self.term for t1 in p.term]
+        if isinstance(p, laurent):
+            if self.op_cache is not None: return self.cached_op('*', p)
+            return self.mul(p)
 
-        
-        elif isinstance(p, int) or isinstance(p, float) or isinstance(p, term):
-            new_p.term = [term(t) * p for t in self.term]
-            
-        new_p.canonical()
-        
-        return new_p
+        if isinstance(p, term):
+            return self.from_coefs({mono_mul(m, p.mono): c * p.coef for m, c in self.coefs.items()})
+
+        if isinstance(p, int) or isinstance(p, float):
+            return self.from_coefs({m: c * p for m, c in self.coefs.items()})
+
+        raise ValueError("Multiplying by unsupported type.")
 
     def __pow__(self, i):
-        ''' ** operator '''
-        new_p = laurent(1)
-        for n in range(i): # TODO: use map/reduce
-            new_p *= self
-        return new_p
+        ''' ** operator, see power '''
+        if self.op_cache is not None: return self.cached_op('**', i)
+        return self.power(i)
 
     def __divmod__(self, p):
-        ''' returns [self/p, 0] if p divides self, otherwise returns [self/p, sel/p] after len(self) steps '''
-        # trivials
-        if p.zeroQ(): raise ZeroDivisionError
-        if self.zeroQ(): return [ laurent(0), laurent(p)]
-        
-        q, r = laurent(), laurent(self) # quotient and reminder
-        
-        for _ in self.term:
-            t0 = r.term[0] // p.term[0]
-            q += t0 
-            r -= (p * t0)
-            r.canonical()
-            if r.zeroQ(): return [q, r] 
-    
-        return [q,r]
+        ''' returns [self/p, 0] if p divides self, otherwise returns [self/p, sel/p] after len(self) steps, see divide '''
+        if self.op_cache is not None: return self.cached_op('divmod', p)
+        return self.divide(p)
     
     def __floordiv__(self, p):
         ''' / operator, see __divmod__ '''
@@ -584,7 +1485,10 @@ class laurent:
     
     # Right arithemrics
 
-    #def __radd__(self, arg): N/A
+    def __radd__(self, p):
+        ''' + operator with the polynomial on the right, e.g. 1 + p or the builtin sum '''
+        return self + p
+
     #def __rsub__(self, arg): N/A
     #def __rmul__(self, arg): N/A
     #def __rpow__(self, arg): N/A
@@ -605,50 +1509,31 @@ class laurent:
     # Arithmeric assignment
 
     def __iadd__(self, p):
-        ''' += operator '''
-                
-        if isinstance(p,laurent):
-            #self.term += [ term(t) for t in p.term] # makes copies
-            self.term += list(map(term, p.term))
-
-        elif isinstance(p,term) or isinstance(p, int) or isinstance(p, float):
-            self.term.append(term(p)) # makes a copy
-
-        else:
-            raise ValueError("Adding unsupported type.")
-
-        self.canonical()
-        return self
-        
+        ''' += operator, merges the terms of p into self in O(len(p)) '''
+        self.check_modulus(p, 'Adding')
+        return self.add_terms(p)
         
     def __isub__(self, p):
         ''' -= operator '''
-        
-        if isinstance(p,laurent):
-            self.term +=  [-t for t in p.term]  # makes copies
-
-
-        elif isinstance(p,term) or isinstance(p, int) or isinstance(p,float):
-            self.term += [-p]  # makes a copy
-
-
-        self.canonical()
-
-        return self
+        self.check_modulus(p, 'Subtracting')
+        return self.add_terms(p, -1)
         
     def __imul__(self, p):
         ''' *= operator '''
-        self.term = (self * p).term
+        self.coefs = (self * p).coefs
+        self._cache.clear()
         return self
     
     def __ipow__(self, n):
         ''' **= operator '''
-        self.term = (self ** n).term
+        self.coefs = (self ** n).coefs
+        self._cache.clear()
         return self
 
     def __ifloordiv__(self, p):
         ''' /= operator '''
-        self.term = (self // p).term
+        self.coefs = (self // p).coefs
+        self._cache.clear()
         return self
 
     #def __itruediv__(self, arg): N/A
@@ -656,7 +1541,8 @@ class laurent:
          
     def __imod__(self, p):
         ''' %= operator '''
-        self.term = (self % p).term
+        self.coefs = (self % p).coefs
+        self._cache.clear()
         return self
     
     # Arithmeric assignment (logic)    
@@ -671,28 +1557,19 @@ class laurent:
 
     def __neg__(self):
         ''' - unary operator '''
-        new_p = laurent(self)
-        for t in new_p.term:
-            t.coef *= -1
-        return new_p
+        return self.from_coefs({m: -c for m, c in self.coefs.items()})
 
     def __pos__(self):
         ''' + unary operator, makes a copy'''
-        return laurent(self)
+        return type(self)(self)
 
     def __abs__(self):
         ''' replaces all coefficients with their absolute value '''
-        new_p = laurent(self)
-        for t in new_p.term:
-            t.coef = abs(t.coef)
-        return new_p
+        return self.from_coefs({m: abs(c) for m, c in self.coefs.items()})
 
     def __invert__(self):
         ''' replaces all variables v with v^-1 '''
-        new_p = laurent()
-        new_p.term = [~t for t in self.term]
-        new_p.canonical()
-        return new_p
+        return self.from_coefs({mono_inv(m): c for m, c in self.coefs.items()})
         
     # Conversion
 
@@ -735,93 +1612,1553 @@ class laurent:
     # Custom methods (sorting)
     
     def canonical(self):
-        ''' orders the polynomial and adds up coefficients of similar terms '''
+        ''' removes terms with zero coefficients and forgets the cached order '''
+        if any(c == 0 for c in self.coefs.values()):
+            self.coefs = {m: c for m, c in self.coefs.items() if c != 0}
+        self._cache.clear()
+
+    def add_term(self, mono, coef):
+        ''' adds the term coef * mono to the polynomial in place '''
+        c = self.coefs.get(mono, 0) + coef
+        if c != 0:
+            self.coefs[mono] = c
+        elif mono in self.coefs:
+            del self.coefs[mono]
+        if self._cache: self._cache.clear()
+
+    def add_terms(self, p, sign = 1):
+        ''' adds p (a polynomial, term or number) to the polynomial in place, or subtracts it for sign -1 '''
+        if isinstance(p, laurent):
+            for m, c in list(p.coefs.items()): # a copy, p may be self
+                self.add_term(m, c if sign == 1 else -c)
+
+        elif isinstance(p, term):
+            self.add_term(p.mono, p.coef if sign == 1 else -p.coef)
+
+        elif isinstance(p, int) or isinstance(p, float):
+            self.add_term((), p if sign == 1 else -p)
 
-        # add similar terms in canonical form
-        split_terms = defaultdict(list)
-        for t in self.term:
-            split_terms[tuple(sorted(t.degree.items()))].append(t)
+        else:
+            raise ValueError(("Adding" if sign == 1 else "Subtracting") + " unsupported type.")
 
-        self.term = list(filter(lambda t: not t.zeroQ(), [reduce(operator.add,split_terms[tnc]) for tnc in sorted(split_terms)]))
+        return self
 
-        for t in self.term: t.canonical()
+    def check_modulus(self, p, action):
+        ''' raises ValueError if p is a polynomial of another coefficient domain: modulo another prime, or modulo
+        a prime when self has integer coefficients or the other way round (numbers and terms fit any domain) '''
+        if isinstance(p, laurent) and p.modulus != self.modulus:
+            raise ValueError(action + ' different moduli.')
+
+    def monomials(self):
+        ''' returns the list of monomials in (printed) order, sorted only when needed '''
+        if 'order' not in self._cache:
+            self._cache['order'] = sorted(self.coefs)
+        return self._cache['order']
+
+    @property
+    def term(self):
+        ''' ordered list of terms (new term objects, changing them does not change the polynomial) '''
+        return [term.from_mono(self.coefs[m], m) for m in self.monomials()]
+
+    @term.setter
+    def term(self, terms):
+        ''' replaces the polynomial by the sum of terms '''
+        self.coefs = {}
+        self._cache.clear()
+        for t in terms:
+            self.add_term(t.mono, t.coef)
+
+    def leading_term(self):
+        ''' the first term in printed order '''
+        m = self.monomials()[0] if 'order' in self._cache else min(self.coefs)
+        return term.from_mono(self.coefs[m], m)
+
+
+    def freeze(self):
+        ''' returns an immutable, hashable copy in the same coefficient domain (see frozenlaurent and frozenmodlaurent) '''
+        if isinstance(self, frozenlaurent): return self
+        return frozenlaurent(self) if self.modulus is None else modlaurent.over(self.modulus).frozen(self)
+
+    def lazy(self):
+        ''' the polynomial as a lazy expression (see lazy) '''
+        return lazy(self)
+
+    # Custom methods (serialization)
+
+    def to_bytes(self):
+        ''' the polynomial in the binary format (see dumps) '''
+        return dumps([self])
+
+    @classmethod
+    def from_bytes(cls, data):
+        ''' reads a polynomial written by to_bytes '''
+        return laurentfile(data).get(0, cls)
+
+    def __reduce__(self):
+        ''' pickles a packed exponent matrix and the coefficients (see pack_coefs) instead of the dictionary '''
+        attributes = {k: v for k, v in self.__dict__.items() if k not in ('coefs', '_cache', '_hash')}
+        return (unpickle_laurent, (type(self),) + pack_coefs(self.coefs), attributes or None)
+
+    # Custom methods (arithmetic)
+
+    def power(self, i):
+        ''' i-th power, by squaring and multiplying (multinomial expansion for polynomials with few terms),
+        if cache_powers is set the powers computed on the way are kept on the polynomial until it changes '''
+        if not isinstance(i, int): raise ValueError('Only integer powers are supported.')
+        if i < 0 and not self.monomialQ(): raise ValueError('Negative power of a polynomial that is not a monomial.')
+        if i == 0: return type(self)(1)
+        powers = self._cache.setdefault('powers', {}) if self.cache_powers else {}
+        result = self.from_coefs(dict(self.power_coefs(i, powers)))
+        if 'box' in self._cache and self.modulus is None and integral(self):
+            result._cache['box'] = nonzero_box((v, (lo * i, hi * i) if i > 0 else (hi * i, lo * i)) for v, (lo, hi) in self._cache['box'].items())
+        return result
+
+    def power_coefs(self, i, powers):
+        ''' coefficient dictionary of self ** i (i != 0), dictionary powers (exponent -> coefficients)
+        memoizes the powers, the largest known power j <= i is reused as p^i = p^j * p^(i-j) '''
+        if i in powers: return powers[i]
+        if i == 1:
+            coefs = self.coefs
+        elif (len(self) <= 1 or i < 0) and self.modulus is not None: # modular inverse for i < 0
+            coefs = {mono_pow(m, i): pow(c if i > 0 else inverse_mod(c, self.modulus), abs(i), self.modulus) for m, c in self.coefs.items()}
+        elif len(self) <= 1 or i < 0:
+            coefs = {mono_pow(m, i): (c ** i if i > 0 or abs(c) != 1 else c ** -i) for m, c in self.coefs.items()}
+        elif len(self) <= self.multinomial_terms:
+            coefs = pow_multinomial(self.coefs, i)
+        else:
+            j = max((k for k in powers if 0 < k < i), default = 1)
+            if 2 * j < i: j = i // 2 # square
+            p = self.from_coefs(self.power_coefs(j, powers))
+            coefs = p.mul(p if i == 2 * j else self.from_coefs(self.power_coefs(i - j, powers))).coefs
+        powers[i] = coefs
+        return coefs
+
+    def divide(self, p, order = None, exact = False):
+        ''' returns [quotient, remainder] of the division of self by p, in the monomial order (div_order by default):
+        'print' divides the first terms in printed order for len(self) steps (see div_print), returns [self/p, 0] if
+        p divides self, otherwise [self/p, self%p]; 'lex', 'grlex' and 'grevlex' divide by the heap method (see
+        div_heap). With exact, p must divide self (ValueError otherwise), which is faster. '''
+        # trivials
+        self.check_modulus(p, 'Dividing')
+        if p.zeroQ(): raise ZeroDivisionError
+        if self.zeroQ(): return [type(self)(0), type(self)(0)]
 
+        order = order or self.div_order
+        if exact or order != 'print':
+            q, r = div_heap(self.coefs, p.coefs, order if order != 'print' else 'grevlex', exact)
+        else:
+            q, r = div_print(self.coefs, p.coefs)
+        return [self.from_coefs(q), self.from_coefs(r)]
+
+    def cached_op(self, op, p):
+        ''' self * p, self ** p or divmod(self, p) (op is '*', '**' or 'divmod') through op_cache, keyed
+        by frozen copies of the operands and the types of their coefficients; results are stored frozen and
+        handed out as copies '''
+        key = (op, self.modulus, self.div_order, self.freeze(), coef_types(self),
+               (p.freeze(), coef_types(p)) if isinstance(p, laurent) else (type(p), p))
+        result = self.op_cache.get(key)
+        if result is None:
+            if op == 'divmod':
+                result = tuple(frozenlaurent.from_coefs(r.coefs) for r in self.divide(p))
+            else:
+                result = frozenlaurent.from_coefs((self.mul(p) if op == '*' else self.power(p)).coefs)
+            self.op_cache.put(key, result)
+        if op == 'divmod': return [type(self)(r) for r in result]
+        return type(self)(result)
+
+    def mul(self, p, method = None):
+        ''' product with laurent polynomial p, method selects the engine (mul_method by default) '''
+        self.check_modulus(p, 'Multiplying')
+        result = self.from_coefs(self.mul_coefs(self.coefs, p.coefs, method))
+        if result.coefs and 'box' in self._cache and 'box' in p._cache and self.modulus is None and integral(self) and integral(p):
+            # degrees add up (no cancellation in the extreme terms of integer polynomials)
+            a, b = self._cache['box'], p._cache['box']
+            result._cache['box'] = nonzero_box((v, (a.get(v, (0, 0))[0] + b.get(v, (0, 0))[0], a.get(v, (0, 0))[1] + b.get(v, (0, 0))[1]))
+                                               for v in sorted(a.keys() | b.keys()))
+        return result
+
+    @classmethod
+    def mul_coefs(cls, a, b, method = None):
+        ''' product of coefficient dictionaries a and b by the engine method (mul_method by default), 'auto' takes
+        'dense' for dense factors, 'parallel' for large sparse products if mul_workers is set and 'heap' otherwise '''
+        method = method or cls.mul_method
+        if method == 'auto': method = cls.auto_engine(a, b)
+        if method == 'parallel': return mul_parallel(a, b, cls.mul_workers)
+        return cls.mul_engines[method](a, b)
+
+    @classmethod
+    def auto_engine(cls, a, b):
+        ''' the engine 'auto' takes for coefficient dictionaries a and b '''
+        if min(len(a), len(b)) >= 8 and min(box_density(a), box_density(b)) >= cls.dense_threshold: return 'dense'
+        if cls.mul_workers and len(a) * len(b) >= cls.parallel_threshold: return 'parallel'
+        return 'heap'
+
+    def addmul(self, a, b, factor = 1):
+        ''' self += factor * a * b in place, factor is a number or a term (coefficient times monomial).
+        Sparse products are added term by term into self without building a * b, dense ones (see
+        auto_engine) are multiplied by their engine first; zeros are removed once, at the end, among
+        the monomials written, so a call costs O(len(a) * len(b)) whatever the size of self '''
+        if self.modulus is not None and not isinstance(factor.coef if isinstance(factor, term) else factor, int):
+            raise ValueError('Coefficients modulo a prime must be integers.')
+        self.check_modulus(a, 'Multiplying'), self.check_modulus(b, 'Multiplying')
+        a, b = a.coefs, b.coefs
+        if a is self.coefs: a = dict(a) # self.coefs changes while a and b are read
+        if b is self.coefs: b = dict(b)
+        if isinstance(factor, term):
+            mono, factor = factor.mono, factor.coef
+            if mono: a = {mono_mul(m, mono): c for m, c in a.items()}
+
+        coefs, written = self.coefs, set()
+        if self.mul_method == 'auto' and self.auto_engine(a, b) == 'heap':
+            add_products(coefs, a, b, factor, written)
+        else:
+            product = self.mul_coefs(a, b)
+            add_scaled(coefs, product, factor)
+            written = product.keys()
+        modulus = self.modulus
+        for m in written:
+            c = coefs[m] if modulus is None else coefs[m] % modulus
+            if c == 0:
+                del coefs[m]
+            elif modulus is not None:
+                coefs[m] = c
+        self._cache.clear()
+        return self
+
+    def submul(self, a, b, factor = 1):
+        ''' self -= factor * a * b in place (see addmul) '''
+        return self.addmul(a, b, -factor if not isinstance(factor, term) else term.from_mono(-factor.coef, factor.mono))
+
+    @classmethod
+    def sum(cls, polys):
+        ''' sum of an iterable of polynomials, terms or numbers, like terms are added in one dictionary
+        and zero coefficients are removed once at the end (see accumulator) '''
+        acc = accumulator()
+        for p in polys:
+            acc += p
+        return acc.result(cls)
+
+    @classmethod
+    def prod(cls, polys):
+        ''' product of an iterable of polynomials, terms or numbers, the two smallest factors are multiplied
+        first, so the products form a balanced tree and large intermediate results are few '''
+        heap = [(len(p.coefs), i, p) for i, p in enumerate(x if isinstance(x, laurent) else cls(x) for x in polys)]
+        if not heap: return cls(1)
+        heapq.heapify(heap)
+        count = len(heap)
+        while len(heap) > 1:
+            _, _, p = heapq.heappop(heap)
+            _, _, q = heapq.heappop(heap)
+            pq = p * q
+            heapq.heappush(heap, (len(pq.coefs), count, pq))
+            count += 1
+        p = heap[0][2]
+        return p if type(p) is cls and count > 1 else cls.from_coefs(dict(p.coefs))
+
+
+    # Custom methods (evaluation)
+
+    def compile(self):
+        ''' compiles the polynomial into a Python function of its variables (positional, in the order of
+        the attribute variables of the function), e.g. f = p.compile(); f(3, 4) evaluates at x=3, y=4.
+        Every distinct power of a variable is computed once and terms are added in printed order, so the
+        result is the same number as p(dict) gives. The function is cached until the polynomial changes. '''
+
+        if 'plan' in self._cache: return self._cache['plan']
+
+        variables = sorted({v for m in self.coefs for v in m[::2]})
+        index = {v: i for i, v in enumerate(variables)}
+        namespace, powers, lines = {}, {}, []
+
+        def literal(c):
+            if type(c) in (int, float) and math.isfinite(c): return repr(c)
+            namespace['c%d' % len(namespace)] = c
+            return 'c%d' % (len(namespace) - 1)
+
+        for k, m in enumerate(self.monomials()):
+            factors = [] if self.coefs[m] == 1 and type(self.coefs[m]) is int else [literal(self.coefs[m])]
+            for i in range(0, len(m), 2):
+                v, e = m[i], m[i+1]
+                if e == 1:
+                    factors.append('x%d' % index[v])
+                    continue
+                if (v, e) not in powers:
+                    x, powers[v, e] = 'x%d' % index[v], 'p%d' % len(powers)
+                    if type(e) is int and e < 0: # see exact_pow
+                        lines.append('%s = %s ** %d if type(%s) is int and %s in (1, -1) else %s ** %d' % (powers[v, e], x, -e, x, x, x, e))
+                    else:
+                        lines.append('%s = %s ** %s' % (powers[v, e], x, literal(e)))
+                factors.append(powers[v, e])
+            lines.append(('s = ' if k == 0 else 's += ') + (' * '.join(factors) or '1'))
+
+        source = 'def plan(%s):\n    ' % ', '.join('x%d' % i for i in range(len(variables)))
+        source += '\n    '.join(lines + ['return s' if lines else 'return 0']) + '\n'
+        exec(compile(source, '<laurent plan>', 'exec'), namespace)
+
+        plan = namespace['plan']
+        plan.variables = variables
+        self._cache['plan'] = plan
+        return plan
+
+    def substitute(self, dic):
+        ''' partial evaluation, replaces the variables in dictionary by numbers, e.g. p.substitute({'y': 2}),
+        in one pass over the terms: each power of a value is computed once (exactly for integers, see exact_pow)
+        and the remaining monomials are grouped in a dictionary, so the cost is linear in the number of terms '''
+        powers, coefs = {}, {}
+        for m, c in self.coefs.items():
+            rest = []
+            for i in range(0, len(m), 2):
+                v, e = m[i], m[i+1]
+                if v in dic:
+                    if (v, e) not in powers: powers[v, e] = exact_pow(dic[v], e)
+                    c *= powers[v, e]
+                else:
+                    rest += (v, e)
+            rest = tuple(rest) if len(rest) != len(m) else m
+            coefs[rest] = coefs.get(rest, 0) + c
+        return self.from_coefs(coefs)
+
+    def evaluate(self, dic):
+        ''' value (a number) of the polynomial at values specified in dictionary, which must give all variables.
+        The first evaluation goes over the terms directly, so a one-off call does not pay for compiling, later
+        ones use the compiled plan (see compile); both give the same number. '''
+        if 'plan' in self._cache or self._cache.get('evaluated'):
+            plan = self.compile()
+            return plan(*[dic[v] for v in plan.variables])
+        self._cache['evaluated'] = True
+
+        powers, s = {}, 0
+        for k, m in enumerate(self.monomials()):
+            t = self.coefs[m]
+            for i in range(0, len(m), 2):
+                v, e = m[i], m[i+1]
+                if (v, e) not in powers: powers[v, e] = exact_pow(dic[v], e)
+                t = t * powers[v, e]
+            s = t if k == 0 else s + t
+        return s
+
+    def evaluate_batch(self, values):
+        ''' evaluates the polynomial at many points at once, values maps each variable to an array of values
+        (NumPy arrays, or lists of equal length), e.g. {'x': xs, 'y': ys}, and an array of the values is returned.
+        Each power of a variable is computed once (by squaring and multiplying the lower powers), negative
+        exponents through reciprocals and fractional exponents with power. With NumPy the computation is done
+        in floating point (complex for complex input), without NumPy lists of Python numbers are used. '''
+
+        missing = sorted(set(self.vars()) - set(values))
+        if missing: raise ValueError('No values given for variables ' + ', '.join(missing) + '.')
+
+        if np is None:
+            X = {v: list(values[v]) for v in values}
+            n = len(next(iter(X.values()))) if X else 1
+            result = [0] * n
+            for m, c in self.coefs.items():
+                t = [c] * n
+                for i in range(0, len(m), 2):
+                    t = [a * x ** m[i+1] for a, x in zip(t, X[m[i]])]
+                result = [a + b for a, b in zip(result, t)]
+            return result
+
+        X = {v: np.asarray(values[v]) for v in values}
+        X = {v: x.astype(np.result_type(x, np.float64), copy = False) for v, x in X.items()}
+        shape = np.broadcast(*X.values()).shape if X else ()
+        powers = {}
+
+        def power(v, e):
+            ''' v^e, memoized '''
+            if (v, e) not in powers:
+                if e == 1: powers[v, e] = X[v]
+                elif not isinstance(e, int): powers[v, e] = np.power(X[v], e)
+                elif e < 0: powers[v, e] = 1 / power(v, -e)
+                else:
+                    half = power(v, e // 2)
+                    powers[v, e] = half * half if e % 2 == 0 else half * half * X[v]
+            return powers[v, e]
+
+        result = np.zeros(shape, dtype = np.result_type(*X.values(), np.float64) if X else np.float64)
+        buffer = np.empty_like(result)
+        for m, c in self.coefs.items():
+            if not m:
+                result += c
+                continue
+            np.multiply(power(m[0], m[1]), c, out = buffer)
+            for i in range(2, len(m), 2):
+                buffer *= power(m[i], m[i+1])
+            result += buffer
+        return result
 
 
     # Custom method (degrees, spans)
 
+    def bounds(self):
+        ''' exponent bounds of the terms, {v: (min, max, count)} over the terms with variable v (count of them),
+        computed in one pass and cached until the polynomial changes '''
+        if 'bounds' not in self._cache:
+            bounds = {}
+            for m in self.coefs:
+                for i in range(0, len(m), 2):
+                    v, e = m[i], m[i+1]
+                    b = bounds.get(v)
+                    bounds[v] = (e, e, 1) if b is None else (min(b[0], e), max(b[1], e), b[2] + 1)
+            self._cache['bounds'] = bounds
+        return self._cache['bounds']
+
+    def box(self):
+        ''' bounding box of the Newton polytope, {v: (min degree, max degree)} in variable order, a term without v
+        has degree 0 in v. Cached, products of integer polynomials get it from their factors (see mul) '''
+        if 'box' not in self._cache:
+            n = len(self.coefs)
+            self._cache['box'] = {v: (min(lo, 0), max(hi, 0)) if count < n else (lo, hi)
+                                  for v, (lo, hi, count) in sorted(self.bounds().items())}
+        return self._cache['box']
+
     def vars(self):
-        ''' returns set of all vars used in any of the terms '''
-        return sorted(v for t in self.term for v in t.degree)
+        ''' returns the sorted list of the vars used in any of the terms '''
+        return list(self.box())
 
     def max_deg(self, v = None):
-        ''' returns maximal degree of variable v, or a dictionary of maximal degrees if v not supplied '''
+        ''' returns maximal degree of variable v (over the terms with v), or a dictionary of maximal degrees if v not supplied '''
         if v is None:
-            return {v: max((t.degree[v] if v in t.degree else 0) for t in self.term ) for v in self.vars()}
-        return max((t.degree[v] if v in t.degree else 0) for t in self.term if v in t.degree)
+            return {v: hi for v, (lo, hi) in self.box().items()}
+        hi = self.box()[v][1] if v in self.box() else None
+        if hi is None: raise ValueError('%s does not appear in the polynomial.' % v)
+        return hi if hi != 0 else self.bounds()[v][1]
            
-        
     def min_deg(self, v = None):
-        ''' returns maximal degree of variable v, or a dictionary of maximal degrees if v not supplied '''
+        ''' returns minimal degree of variable v, or a dictionary of minimal degrees if v not supplied '''
         if v is None:
-            return {v: min((t.degree[v] if v in t.degree else 0) for t in self.term ) for v in self.vars()}
-        return min((t.degree[v] if v in t.degree else 0) for t in self.term)
+            return {v: lo for v, (lo, hi) in self.box().items()}
+        if not self.coefs: raise ValueError('The zero polynomial has no degrees.')
+        return self.box()[v][0] if v in self.box() else 0
 
     def min_max_deg(self, v = None):
         ''' returns a list of max/min digrees of variable v, or a dictionary if v not supplied '''
         if v is None:
-            min_degs, max_degs = self.min_deg(), self.max_deg()
-            return {u: (min_degs[u], max_degs[u]) for u in min_degs}
+            return dict(self.box())
         return (self.min_deg(v), self.max_deg(v))
         
     def span(self, v = None):
         ''' returns the span of variable v, or a dictionary of spans if v not supplied '''
         if v is None:
-            minmax = self.min_max_deg(v)
-            return {u: minmax[u][1] - minmax[u][0] for u in minmax}
+            return {u: hi - lo for u, (lo, hi) in self.box().items()}
         return self.max_deg(v) - self.min_deg(v)
-        
+
+    def total_degree(self):
+        ''' (min, max) of the total degrees (sums of exponents) of the terms, cached '''
+        if 'total' not in self._cache:
+            if not self.coefs: raise ValueError('The zero polynomial has no degrees.')
+            degrees = [sum(m[1::2]) for m in self.coefs]
+            self._cache['total'] = (min(degrees), max(degrees))
+        return self._cache['total']
+
+    def newton(self):
+        ''' vertices of the Newton polytope (convex hull of the exponent vectors in the order of vars) of a polynomial
+        in at most two variables, counterclockwise from the smallest, cached '''
+        if 'newton' not in self._cache:
+            variables = self.vars()
+            if len(variables) > 2: raise ValueError('Newton polygon vertices need at most two variables.')
+            points = sorted(set(tuple(dict(zip(m[::2], m[1::2])).get(v, 0) for v in variables) for m in self.coefs))
+            self._cache['newton'] = convex_hull(points) if len(variables) == 2 else points[:1] + points[1:][-1:]
+        return self._cache['newton']
+
+    # Custom methods (truncated arithmetic)
+
+    def truncate(self, bounds = None, degree = None):
+        ''' the terms with degrees in the window of bounds ({variable: (low, high)}) and degree ((low, high) of the
+        total degree), None is an open end, e.g. p.truncate({'A': (-10, 10)}) '''
+        return self.from_coefs(in_window(self.coefs, degree_window(bounds, degree)))
+
+    def mul_trunc(self, p, bounds = None, degree = None):
+        ''' (self * p).truncate(bounds, degree), computing only the terms in the window (see mul_window) '''
+        self.check_modulus(p, 'Multiplying')
+        window = degree_window(bounds, degree)
+        if not window: return self.mul(p)
+        return self.from_coefs(self.mul_coefs_window(self.coefs, p.coefs, window))
+
+    @classmethod
+    def mul_coefs_window(cls, a, b, window):
+        ''' the terms of the product of coefficient dictionaries a and b in window, by mul_window, or by mul_slices
+        with the dense engine for dense factors '''
+        if cls.mul_method == 'auto' and cls.auto_engine(a, b) == 'dense':
+            return mul_slices(a, b, window, lambda x, y: cls.mul_coefs(x, y, 'dense'))
+        return mul_window(a, b, window)
+
+    def pow_trunc(self, n, bounds = None, degree = None):
+        ''' (self ** n).truncate(bounds, degree) by squaring and multiplying, every power self^k on the way keeps
+        only the terms that can land in the window when multiplied by self^(n-k) (from the degree bounds of self) '''
+        window = degree_window(bounds, degree)
+        if not window or n <= 0 or self.zeroQ(): return self.power(n).truncate(bounds, degree)
+
+        box, total = self.box(), self.total_degree()
+        def widened(r): # window for self^k with r = n - k factors to go
+            return [(v, lo if lo is None else lo - r * (total[1] if v is None else box.get(v, (0, 0))[1]),
+                     hi if hi is None else hi - r * (total[0] if v is None else box.get(v, (0, 0))[0])) for v, lo, hi in window]
+
+        coefs, k = in_window(self.coefs, widened(n - 1)), 1
+        for bit in bin(n)[3:]:
+            k *= 2
+            coefs = self.mul_coefs_window(coefs, coefs, widened(n - k))
+            if bit == '1':
+                k += 1
+                coefs = self.mul_coefs_window(coefs, self.coefs, widened(n - k))
+        return self.from_coefs(coefs)
+
+    def divmod_trunc(self, p, bounds = None, degree = None, order = None):
+        ''' [quotient, remainder] of self.divide(p, order) truncated to the window (see truncate). In the graded orders
+        'grlex' and 'grevlex' with a lower bound on the total degree, the heap division stops below the bound, so the
+        terms below it are not computed (see div_heap); otherwise the whole division is done and then truncated '''
+        order = order or self.div_order
+        if degree is not None and degree[0] is not None and order in ('grlex', 'grevlex'):
+            self.check_modulus(p, 'Dividing')
+            if p.zeroQ(): raise ZeroDivisionError
+            if self.zeroQ(): return [type(self)(0), type(self)(0)]
+            window = degree_window(bounds, degree)
+            q, r = div_heap(self.coefs, p.coefs, order, floor = degree[0]) # total degree first, as in the order
+            return [self.from_coefs(in_window(q, window)), self.from_coefs(in_window(r, window))]
+        q, r = self.divide(p, order)
+        return [q.truncate(bounds, degree), r.truncate(bounds, degree)]
+
+    # Custom methods (gcd)
+
+    def content(self):
+        ''' greatest common divisor of the (integer) coefficients, 0 for the zero polynomial '''
+        if any(not isinstance(c, int) for c in self.coefs.values()): raise ValueError('Content needs integer coefficients.')
+        return int_content(self.coefs)
+
+    def monomial_factor(self):
+        ''' the monomial (a term with coefficient 1) of the smallest degrees, dividing by it makes them 0 (see normalize) '''
+        return term.from_mono(1, mono_from_dict(self.min_deg()))
+
+    def normalize(self):
+        ''' the polynomial divided by its monomial factor, so min_deg is 0 for every variable '''
+        m = mono_inv(self.monomial_factor().mono)
+        return self.from_coefs({mono_mul(mono, m): c for mono, c in self.coefs.items()}) if m else type(self)(self)
+
+    def primitive(self):
+        ''' the normalized polynomial divided by its content, with a positive coefficient of the largest monomial in lex order '''
+        p = self.normalize()
+        if p.zeroQ(): return p
+        c = p.content()
+        return scale_div(p, -c if p.coefs[lex_leading(p.coefs)] < 0 else c)
+
+    def gcd(self, p):
+        ''' greatest common divisor with polynomial p (integer coefficients): monomials are units of Laurent polynomials,
+        so the result is normalized (min_deg 0), its content is the gcd of the contents and the coefficient of its
+        largest monomial in lex order is positive. By the heuristic gcd, primitive remainder sequences if it fails. '''
+        f, g = self.normalize(), p.normalize()
+        for q in (f, g):
+            if any(not isinstance(c, int) for c in q.coefs.values()): raise ValueError('Gcd needs integer coefficients.')
+            if any(not isinstance(e, int) for m in q.coefs for e in m[1::2]): raise ValueError('Gcd needs integer exponents.')
+        h = gcd_poly(f, g, sorted(set(f.vars()) | set(g.vars())))
+        return -h if not h.zeroQ() and h.coefs[lex_leading(h.coefs)] < 0 else h
+
     # Custom methods (queries)
     
     def monomialQ(self):
         ''' True if polynomial is a monomial (has one term), False otherwise '''
-        return len(self.term) == 1
+        return len(self.coefs) == 1
             
     def intQ(self):
         ''' True if polynomial is an integer, False otherwise  '''
-        return self.monomialQ() and self.term[0].intQ()
+        return self.monomialQ() and () in self.coefs
         
     def zeroQ(self):
         ''' True if polynomial is 0, False otherwise '''
-        return len(self.term) == 0
+        return len(self.coefs) == 0
         
     def oneQ(self):
         ''' True if polynomial is 1, False otherwise '''
-        return self.monomialQ() and self.term[0].oneQ()
+        return self.monomialQ() and self.coefs.get(()) == 1
 
     def minusoneQ(self):
         ''' True if polynomial is -1, False otherwise '''
-        return self.monomialQ() and self.term[0].minusoneQ()
-
+        return self.monomialQ() and self.coefs.get(()) == -1
+
+
+    def collected(self, s):
+        ''' groups the terms by their monomials in the variables s (a string of one letter variables or a list),
+        returns a dictionary {monomial in s: coefficient polynomial in the other variables}, e.g. for
+        2Ax + 2x + y and s = 'x' {('x', 1): 2A + 2, (): y}. Groups are in the printed order of their first term
+        and coefficients keep their terms in the order of self. The coefficients are frozen polynomials (see freeze),
+        cached on the polynomial until it changes, the dictionary is new on every call. '''
+
+        key = ('collect', tuple(s))
+        if key in self._cache: return dict(self._cache[key])
+
+        variables = set(s)
+        groups = {}
+        for m in self.monomials():
+            inside, rest = (), ()
+            for i in range(0, len(m), 2):
+                if m[i] in variables:
+                    inside += m[i:i+2]
+                else:
+                    rest += m[i:i+2]
+            group = groups.get(inside)
+            if group is None: group = groups[inside] = {}
+            group[rest] = self.coefs[m]
+
+        groups = {m: self.from_coefs(coefs).freeze() for m, coefs in groups.items()}
+        self._cache[key] = groups
+        return dict(groups)
 
     def collect(self, s):
         ''' collect vars in s, e.g. s = "xy", we collect x & y's, (a+a^2)x + (3+a)xy^3 '''
 
-        ev_dict = {v:1 for v in s}
-        groups = defaultdict(list)
-
-        for t in self.term:
-            groups[tuple( (v, t.degree[v] if v in t.degree else 0) for v in s )].append(t(ev_dict))
-
-        s = ''
-        for i, (g, poly) in enumerate(groups.items()):
+        s, out = list(s), ''
+        for i, (g, poly) in enumerate(self.collected(s).items()):
+            poly = [term.from_mono(c, m) for m, c in poly.coefs.items()]
             abs1 = False
             if len(poly) == 1:
                 sp, abs1 = str(poly[0]), abs(poly[0]).oneQ()
             else:
-                sp =  '('+' '.join(('+ ' if i != 0 and s[0] != '-' else '') + s for i, s in enumerate(map(str, poly)))+')'
-            sg = ''.join( [ (v if e else '') + ( ('^'+str(e)) if e not in (0,1) else '' ) for v,e in g  ] )
-            s += (' + ' if i and sp[0] != '-' else (' ' if i else '')) + (sp[:-1] if abs1 and sg else sp) + sg
+                sp =  '('+' '.join(('+ ' if i != 0 and t[0] != '-' else '') + t for i, t in enumerate(map(str, poly)))+')'
+            degree = dict(zip(g[::2], g[1::2]))
+            sg = ''.join( [ (v if e else '') + ( ('^'+str(e)) if e not in (0,1) else '' ) for v, e in ((v, degree.get(v, 0)) for v in s) ] )
+            out += (' + ' if i and sp[0] != '-' else (' ' if i else '')) + (sp[:-1] if abs1 and sg else sp) + sg
 
-        return s
+        return out
+
+class frozenlaurent(laurent):
+    '''immutable, hashable laurent polynomial, operators return new frozen polynomials (e.g. p += q rebinds p),
+    the hash is computed once and unequal hashes reject equality in O(1)'''
+
+    interned = weakref.WeakValueDictionary() # (modulus, hash) -> shared polynomial, see intern
+
+    def __init__(self, s = None):
+        ''' same arguments as laurent '''
+        laurent.__init__(self)
+        self._hash = None
+        if isinstance(s, frozenlaurent):
+            self.coefs, self._hash = s.coefs, s._hash # shared, neither can change
+        elif s is not None:
+            self.coefs = laurent(s).coefs
+
+    @classmethod
+    def intern(cls, p):
+        ''' hash-consing, returns the shared frozen polynomial equal to p (a polynomial or anything laurent accepts),
+        so identical polynomials interned this way are one object; unused entries disappear with their last reference '''
+        p = p.freeze() if isinstance(p, laurent) else cls(p)
+        key = (p.modulus, hash(p)) # equal coefficients in another domain are another polynomial
+        q = cls.interned.get(key)
+        if q is None:
+            cls.interned[key] = p
+            return p
+        return q if q.coefs == p.coefs else p # p is not shared on a hash collision
+
+    def __hash__(self):
+        if self._hash is None:
+            self._hash = hash(frozenset(self.coefs.items()))
+        return self._hash
+
+    def __eq__(self, p):
+        ''' == operator '''
+        if self is p: return True
+        if isinstance(p, frozenlaurent) and hash(self) != hash(p): return False
+        return laurent.__eq__(self, p)
+
+    def __ne__(self, p):
+        ''' != operator '''
+        return not self == p
+
+    def __add__(self, p):
+        ''' + operator '''
+        return self.from_coefs(laurent.__add__(self, p).coefs)
+
+    def __sub__(self, p):
+        ''' - operator '''
+        return self.from_coefs(laurent.__sub__(self, p).coefs)
+
+    def __pos__(self):
+        ''' + unary operator, frozen polynomials are not copied '''
+        return self
+
+    # Arithmeric assignment (returns a new polynomial)
+
+    def __iadd__(self, p):
+        return self + p
+
+    def __isub__(self, p):
+        return self - p
+
+    def __imul__(self, p):
+        return self * p
+
+    def __ipow__(self, n):
+        return self ** n
+
+    def __ifloordiv__(self, p):
+        return self // p
+
+    def __imod__(self, p):
+        return self % p
+
+    # Custom methods
+
+    def add_term(self, mono, coef):
+        ''' not supported, frozen polynomials cannot change '''
+        raise TypeError('frozenlaurent is immutable.')
+
+    def addmul(self, a, b, factor = 1):
+        ''' not supported, frozen polynomials cannot change '''
+        raise TypeError('frozenlaurent is immutable.')
+
+    @laurent.term.setter
+    def term(self, terms):
+        ''' not supported, frozen polynomials cannot change '''
+        raise TypeError('frozenlaurent is immutable.')
+
+
+class accumulator:
+    ''' collects terms and polynomials to be added: like terms are added into one dictionary as they come
+    and zero coefficients are removed only once, by result, e.g.
+    acc = accumulator(); for p in polys: acc += p; s = acc.result() '''
+
+    def __init__(self):
+        self.coefs = {} # monomial -> coefficient, may hold zeros until result
+
+    def add_term(self, mono, coef):
+        ''' adds the term coef * mono '''
+        self.coefs[mono] = self.coefs.get(mono, 0) + coef
+
+    def add(self, p, scale = 1):
+        ''' adds scale * p, where p is a polynomial, term or number '''
+        coefs = self.coefs
+        if isinstance(p, laurent):
+            if not coefs and scale == 1:
+                coefs.update(p.coefs)
+            else:
+                for m, c in p.coefs.items():
+                    coefs[m] = coefs.get(m, 0) + scale * c
+        elif isinstance(p, term):
+            self.add_term(p.mono, scale * p.coef)
+        elif isinstance(p, int) or isinstance(p, float):
+            self.add_term((), scale * p)
+        else:
+            raise ValueError("Adding unsupported type.")
+
+    def __iadd__(self, p):
+        self.add(p)
+        return self
+
+    def __isub__(self, p):
+        self.add(p, -1)
+        return self
+
+    def __len__(self):
+        return len(self.coefs)
+
+    def result(self, cls = None):
+        ''' the sum collected so far as a polynomial of class cls (laurent by default) '''
+        return (cls or laurent).from_coefs({m: c for m, c in self.coefs.items() if c != 0})
+
+    def clear(self):
+        self.coefs = {}
+
+
+class lazy:
+    ''' lazy polynomial expression, e.g. a, b, c = map(lazy, (p, q, r)); e = a * b + c ** 3 - 2 * a;
+    operators build a DAG of nodes instead of computing, equal subexpressions (same operands) are the same node and
+    are computed once. The expression is computed when observed (repr, ==, len, value or any laurent attribute,
+    e.g. e.span()) and the result is kept frozen, value() hands out copies. Sums are computed into one dictionary, products used only in one sum are
+    added to it as their terms are multiplied (up to fuse_limit pairs of terms) and zero coefficients are removed only
+    once, at the end. Results have the class of the leaf polynomials (the mutable class if some are frozen and some not),
+    leaves of numbers or strings fit any class, and laurent and modlaurent polynomials do not mix (ValueError, as
+    for their operators). Nodes: 'leaf' (a frozen polynomial), 'add' (pairs of a number and a node), 'mul' (nodes), 'pow' '''
+
+    nodes = weakref.WeakValueDictionary() # key -> node, see node
+    fuse_limit = 1 << 14 # larger products in sums are multiplied by laurent.mul_coefs first
+
+    def __new__(cls, p):
+        ''' leaf holding a frozen copy of polynomial p (or of what laurent accepts) '''
+        if isinstance(p, lazy): return p
+        domain = type(p) if isinstance(p, laurent) else None
+        p = p.freeze() if isinstance(p, laurent) else frozenlaurent(p)
+        return cls.node('leaf', (p,), ('leaf', domain, p, coef_types(p)), domain)
+
+    @classmethod
+    def node(cls, op, args, key = None, domain = None):
+        ''' the node op(args), shared with equal nodes that exist; domain is the class of its value (by default
+        the common class of the nodes in args, None for numbers, which fit any class) '''
+        if key is None:
+            key = (op,) + tuple((a[0], id(a[1])) if type(a) is tuple else id(a) if isinstance(a, lazy) else a for a in args)
+        n = cls.nodes.get(key)
+        if n is None:
+            if domain is None:
+                children = [a[1] if type(a) is tuple else a for a in args]
+                domain = functools.reduce(common_domain, [c.domain for c in children if isinstance(c, lazy)], None)
+            n = object.__new__(cls)
+            n.op, n.args, n.result, n.domain = op, args, None, domain
+            cls.nodes[key] = n
+        return n
+
+    # Expression building
+
+    @staticmethod
+    def operand(p):
+        return p if isinstance(p, lazy) else lazy(p)
+
+    def summands(self, scale = 1):
+        ''' pairs (number, node) of the sum, a computed sum is one summand '''
+        if self.op == 'add' and self.result is None:
+            return [(scale * c, n) for c, n in self.args]
+        return [(scale, self)]
+
+    @classmethod
+    def add(cls, summands):
+        merged = {}
+        for c, n in summands:
+            merged[n] = merged.get(n, 0) + c
+        return cls.node('add', tuple((c, n) for n, c in merged.items() if c != 0))
+
+    def __add__(self, p):
+        return self.add(self.summands() + self.operand(p).summands())
+
+    def __radd__(self, p):
+        return self.add(self.operand(p).summands() + self.summands())
+
+    def __sub__(self, p):
+        return self.add(self.summands() + self.operand(p).summands(-1))
+
+    def __rsub__(self, p):
+        return self.add(self.operand(p).summands() + self.summands(-1))
+
+    def __neg__(self):
+        return self.add(self.summands(-1))
+
+    def __pos__(self):
+        return self
+
+    def __mul__(self, p):
+        if isinstance(p, int) or isinstance(p, float): return self.add(self.summands(p))
+        factors = []
+        for n in (self, self.operand(p)):
+            factors += n.args if n.op == 'mul' and n.result is None else (n,)
+        return self.node('mul', tuple(factors))
+
+    def __rmul__(self, p):
+        if isinstance(p, int) or isinstance(p, float): return self.add(self.summands(p))
+        return self.operand(p) * self
+
+    def __pow__(self, n):
+        if not isinstance(n, int): raise ValueError('Only integer powers are supported.')
+        return self.node('pow', (self, n))
+
+    # Evaluation
+
+    def value(self):
+        ''' the polynomial the expression evaluates to, a new polynomial unless the class of the result is frozen
+        (the node keeps its result frozen, see computed) '''
+        result, domain = self.computed(), self.domain or laurent
+        return result if type(result) is domain else domain(result)
+
+    def computed(self):
+        ''' the frozen result of the expression, computed once and shared by everyone holding the node '''
+        if self.result is None:
+            self.result = (self.domain or laurent).from_coefs(dict(self.compute({}, self.references()))).freeze()
+        return self.result
+
+    def children(self):
+        if self.op == 'add': return [n for _, n in self.args]
+        if self.op == 'mul': return list(self.args)
+        if self.op == 'pow': return [self.args[0]]
+        return []
+
+    def references(self):
+        ''' number of nodes using each node of the expression (not computed yet) '''
+        refs, stack = {self: 1}, [self]
+        while stack:
+            n = stack.pop()
+            if n.result is not None: continue
+            for child in n.children():
+                refs[child] = refs.get(child, 0) + 1
+                if refs[child] == 1: stack.append(child)
+        return refs
+
+    def compute(self, memo, refs):
+        ''' coefficient dictionary of the node, which may hold zero coefficients and must not be changed;
+        memo holds the nodes computed in this evaluation, refs the numbers of their users (see references) '''
+        if self.result is not None: return self.result.coefs
+        if self in memo: return memo[self]
+
+        if self.op == 'leaf':
+            coefs = self.args[0].coefs
+        elif self.op == 'pow':
+            coefs = (self.domain or laurent).from_coefs(dict(self.args[0].compute(memo, refs))).power(self.args[1]).coefs
+        elif self.op == 'mul':
+            coefs = self.multiply([n.compute(memo, refs) for n in self.args])
+        else:
+            coefs = {}
+            for c, n in self.args:
+                if n.op == 'mul' and n.result is None and n not in memo and refs.get(n) == 1:
+                    factors = [f.compute(memo, refs) for f in n.args]
+                    if len(factors) > 1: factors = [self.multiply(factors[:-1]), factors[-1]]
+                    if len(factors) == 2 and len(factors[0]) * len(factors[1]) <= self.fuse_limit:
+                        add_products(coefs, factors[0], factors[1], c) # fused, the product is never built
+                        continue
+                    memo[n] = self.multiply(factors)
+                add_scaled(coefs, n.compute(memo, refs), c)
+        memo[self] = coefs
+        return coefs
+
+    @staticmethod
+    def multiply(factors):
+        ''' product of coefficient dictionaries, the two smallest first '''
+        heap = [(len(f), i, f) for i, f in enumerate(factors)]
+        heapq.heapify(heap)
+        i = len(heap)
+        while len(heap) > 1:
+            a, b = heapq.heappop(heap)[2], heapq.heappop(heap)[2]
+            ab = laurent.mul_coefs(a, b)
+            heapq.heappush(heap, (len(ab), i, ab))
+            i += 1
+        return heap[0][2]
+
+    # Observation
+
+    def __repr__(self):
+        return repr(self.computed())
+
+    def __eq__(self, p):
+        return self.computed() == (p.computed() if isinstance(p, lazy) else p)
+
+    def __ne__(self, p):
+        return not self == p
+
+    __hash__ = object.__hash__ # nodes are shared by identity
+
+    def __len__(self):
+        return len(self.computed())
+
+    def __getattr__(self, name):
+        ''' attributes of the computed polynomial, e.g. e.coefs or e.span() '''
+        if name in ('op', 'args', 'result', 'domain'): raise AttributeError(name)
+        return getattr(self.computed(), name)
+
+def common_domain(a, b):
+    ''' the class of lazy results combining classes a and b (None fits any class): laurent or the class modulo
+    their prime if they differ, ValueError for different coefficient domains '''
+    if a is b or b is None: return a
+    if a is None: return b
+    if a.modulus != b.modulus: raise ValueError('Combining different moduli.')
+    return laurent if a.modulus is None else modlaurent.over(a.modulus)
+
+def add_scaled(coefs, a, scale):
+    ''' adds scale * a to coefficient dictionary coefs in place '''
+    if scale == 1:
+        for m, c in a.items():
+            coefs[m] = coefs.get(m, 0) + c
+    else:
+        for m, c in a.items():
+            coefs[m] = coefs.get(m, 0) + scale * c
+
+def add_products(coefs, a, b, scale = 1, written = None):
+    ''' adds scale * a * b to coefficient dictionary coefs in place, term by term; the monomials of the product
+    are added to the set written if it is given '''
+    get = coefs.get
+    if written is not None:
+        add = written.add
+        for ma, ca in a.items():
+            ca *= scale
+            for mb, cb in b.items():
+                m = mono_mul(ma, mb)
+                coefs[m] = get(m, 0) + ca * cb
+                add(m)
+        return
+    for ma, ca in a.items():
+        ca *= scale
+        for mb, cb in b.items():
+            m = mono_mul(ma, mb)
+            coefs[m] = get(m, 0) + ca * cb
+
+
+class modlaurent(laurent):
+    ''' laurent polynomial with integer coefficients modulo a prime, kept in range(modulus); each prime has its own
+    class, modlaurent.over(prime), so results of +, -, * and ** stay in the same coefficient domain, e.g.
+    F = modlaurent.over(2**31 - 1); p = F('x+1') ** 100. Division is not supported. '''
+
+    domains = {} # prime -> class, see over
+
+    @classmethod
+    def over(cls, modulus):
+        ''' the class of polynomials with coefficients modulo modulus (a prime), its attribute frozen is the class
+        of the frozen polynomials modulo modulus (see freeze) '''
+        if not isinstance(modulus, int) or modulus not in modlaurent.domains and not primeQ(modulus):
+            raise ValueError('The modulus must be a prime.')
+        if modulus not in modlaurent.domains:
+            domain = type('modlaurent' + str(modulus), (modlaurent,), {'modulus': modulus})
+            domain.frozen = type('frozenmodlaurent' + str(modulus), (frozenmodlaurent, domain), {})
+            modlaurent.domains[modulus] = domain
+        return modlaurent.domains[modulus]
+
+    def __init__(self, s = None):
+        ''' same arguments as laurent, coefficients are reduced '''
+        if self.modulus is None: raise TypeError('Use modlaurent.over(prime) for the class of a coefficient domain.')
+        laurent.__init__(self, s)
+        self.canonical()
+
+    def __reduce__(self):
+        _, state, attributes = laurent.__reduce__(self)
+        return (unpickle_modlaurent, (self.modulus,) + state[1:], attributes)
+
+    def canonical(self):
+        ''' reduces coefficients modulo the prime, removes zeros and forgets the cached order '''
+        for c in self.coefs.values():
+            if not isinstance(c, int): raise ValueError('Coefficients modulo a prime must be integers.')
+        m = self.modulus
+        self.coefs = {mono: c % m for mono, c in self.coefs.items() if c % m != 0}
+        self._cache.clear()
+
+    def add_term(self, mono, coef):
+        ''' adds the term coef * mono modulo the prime '''
+        if not isinstance(coef, int): raise ValueError('Coefficients modulo a prime must be integers.')
+        laurent.add_term(self, mono, coef)
+        c = self.coefs.get(mono, 0) % self.modulus
+        if c != 0:
+            self.coefs[mono] = c
+        elif mono in self.coefs:
+            del self.coefs[mono]
+
+    def __add__(self, p):
+        ''' + operator '''
+        return self.from_coefs(laurent.__add__(self, p).coefs)
+
+    def __sub__(self, p):
+        ''' - operator '''
+        return self.from_coefs(laurent.__sub__(self, p).coefs)
+
+    def divide(self, p):
+        ''' not supported '''
+        raise TypeError('Division of polynomials modulo a prime is not supported.')
+
+    def divmod_trunc(self, p, bounds = None, degree = None, order = None):
+        ''' not supported '''
+        raise TypeError('Division of polynomials modulo a prime is not supported.')
+
+    def mul(self, p, method = None):
+        ''' product with laurent polynomial p, dense products use mul_dense_mod '''
+        self.check_modulus(p, 'Multiplying')
+        method = method or self.mul_method
+        if method == 'auto': method = self.auto_engine(self.coefs, p.coefs)
+        if method == 'dense':
+            return self.from_coefs(mul_dense_mod(self.coefs, p.coefs, self.modulus))
+        return laurent.mul(self, p, method)
+
+
+class frozenmodlaurent(frozenlaurent, modlaurent):
+    ''' immutable, hashable polynomial modulo a prime, modlaurent.over(prime).frozen is its class for a prime
+    (a subclass of modlaurent.over(prime)), e.g. F = modlaurent.over(7); p = F('3x+5').freeze() '''
+
+    def __init__(self, s = None):
+        ''' same arguments as laurent, coefficients are reduced '''
+        if self.modulus is None: raise TypeError('Use modlaurent.over(prime).frozen for the class of frozen polynomials modulo a prime.')
+        frozenlaurent.__init__(self, s)
+        if not isinstance(s, type(self)):
+            modlaurent.canonical(self)
+            self._hash = None
+
+    def __reduce__(self):
+        _, state, attributes = modlaurent.__reduce__(self)
+        return (unpickle_frozenmodlaurent, state, attributes)
+
+
+def unpickle_modlaurent(modulus, *state):
+    ''' polynomial modulo modulus from the state of modlaurent.__reduce__ '''
+    return modlaurent.over(modulus).from_coefs(unpack_coefs(*state))
+
+def unpickle_frozenmodlaurent(modulus, *state):
+    ''' frozen polynomial modulo modulus from the state of frozenmodlaurent.__reduce__ '''
+    return modlaurent.over(modulus).frozen.from_coefs(unpack_coefs(*state))
+
+def primeQ(n):
+    ''' True if n is a prime, deterministic Miller-Rabin for n < 3.3 * 10^24 '''
+    if n < 2: return False
+    bases = (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41)
+    if n in bases: return True
+    if any(n % b == 0 for b in bases): return False
+    d, s = n - 1, 0
+    while d % 2 == 0: d, s = d // 2, s + 1
+    for b in bases:
+        x = pow(b, d, n)
+        if x == 1 or x == n - 1: continue
+        for _ in range(s - 1):
+            x = x * x % n
+            if x == n - 1: break
+        else:
+            return False
+    return True
+
+def primes_below(n):
+    ''' the primes below n, largest first (a generator) '''
+    for p in range(n - 1, 1, -1):
+        if primeQ(p): yield p
+
+def crt_combine(coefs, modulus, image, prime):
+    ''' Chinese remaindering (Garner's step) of coefficient dictionaries, coefs modulo modulus and image
+    modulo prime, into coefficients in range(modulus * prime) '''
+    inverse = inverse_mod(modulus, prime)
+    result = {}
+    for m in coefs.keys() | image.keys():
+        r = coefs.get(m, 0)
+        c = r + modulus * ((image.get(m, 0) - r) * inverse % prime)
+        if c != 0: result[m] = c
+    return result
+
+def modular_image(f, prime, polys):
+    ''' coefficient dictionary of f applied to polys (packed, see pack_coefs) modulo prime, worker of multimodular '''
+    domain = modlaurent.over(prime)
+    return f(*[domain.from_coefs(unpack_coefs(*p)) for p in polys]).coefs
+
+def multimodular(f, *polys, bound = None, primes = None, workers = None):
+    ''' exact integer polynomial f(*polys), where f uses only +, -, * and ** and polys have integer coefficients,
+    e.g. multimodular(f, p, q) for f defined at module level by def f(p, q): return p * q ** 3. f is computed modulo
+    primes (word sized, from primes_below(2^31) by default) and the coefficients are reconstructed by Chinese
+    remaindering in the symmetric range. With a bound on the absolute values of the coefficients, primes are added
+    until their product exceeds twice the bound, otherwise until the reconstruction stops changing. With workers > 1
+    the primes run in parallel in a process pool, so f must be picklable (a module level function, not a lambda). '''
+    primes = iter(primes or primes_below(1 << 31))
+    packed = [pack_coefs(p.coefs if isinstance(p, laurent) else laurent(p).coefs) for p in polys]
+    coefs, modulus, previous = {}, 1, None
+    while True:
+        batch = list(itertools.islice(primes, workers or 1))
+        if not batch: raise ValueError('Ran out of primes before the reconstruction was stable.')
+        if workers and workers > 1:
+            pool = get_process_pool(workers)
+            images = [job.result() for job in [pool.submit(modular_image, f, prime, packed) for prime in batch]]
+        else:
+            images = [modular_image(f, prime, packed) for prime in batch]
+
+        for prime, image in zip(batch, images):
+            coefs, modulus = crt_combine(coefs, modulus, image, prime), modulus * prime
+            symmetric = {m: (c if 2 * c <= modulus else c - modulus) for m, c in coefs.items()}
+            if (bound is not None and modulus > 2 * bound) or (bound is None and symmetric == previous):
+                return laurent.from_coefs(symmetric)
+            previous = symmetric
+
+
+# Binary format (little endian, sections aligned to 8 bytes)
+#
+#   header      magic b'LAUR', version u16, reserved u16, number of variables u32, number of polynomials u32
+#   variables   per variable: length u16, utf-8 name
+#   index       u64 offset of each record and the end of the last record (n + 1 offsets)
+#   record      number of variables u32, number of terms u32, exponent kind, coefficient kind, 6 bytes padding
+#               variable indices u32 (sorted by name), exponent matrix (a row per term), coefficients
+#
+# Number kinds (exponents and coefficients): the narrowest of 'b' int8, 'h' int16, 'i' int32, 'q' int64 holding all
+# the integers, 'm' float64 with a u8 flag per number marking integers, and for coefficients only 'D' complex (float64
+# pairs) or 'n' integers of any size (u32 byte lengths, then the signed bytes)
+
+BINARY_MAGIC = b'LAUR'
+BINARY_VERSION = 1
+
+file_header = struct.Struct('<4sHHII')
+record_header = struct.Struct('<IIcc6x')
+name_length = struct.Struct('<H')
+
+def padding(n):
+    ''' zero bytes aligning length n to 8 '''
+    return bytes(-n % 8)
+
+def little_endian(a):
+    ''' bytes of array a in little endian order '''
+    if sys.byteorder == 'big':
+        a = array.array(a.typecode, a)
+        a.byteswap()
+    return a.tobytes()
+
+int_kinds = 'bhiq'
+
+def pack_numbers(values, coefficients = False):
+    ''' kind and packed bytes of numbers (see the number kinds above) '''
+    if all(type(x) is int for x in values): # exact type, bools would not survive
+        low, high = (min(values), max(values)) if values else (0, 0)
+        for kind in int_kinds:
+            bits = 8 * struct.calcsize(kind)
+            if -(1 << (bits - 1)) <= low and high < 1 << (bits - 1):
+                return kind, little_endian(array.array(kind, values))
+        if coefficients:
+            data = [x.to_bytes((x.bit_length() + 8) // 8, 'little', signed = True) for x in values]
+            lengths = little_endian(array.array('I', [len(b) for b in data]))
+            return 'n', lengths + padding(len(lengths)) + b''.join(data)
+    if all(isinstance(x, (int, float)) for x in values):
+        if any(isinstance(x, int) and abs(x) > 1 << 53 for x in values):
+            raise ValueError('Integers too large to be stored next to floats.')
+        data = little_endian(array.array('d', values))
+        return 'm', data + bytes(isinstance(x, int) for x in values)
+    if coefficients and all(isinstance(x, (int, float, complex)) for x in values):
+        return 'D', little_endian(array.array('d', [y for x in values for y in (x.real, x.imag)]))
+    raise TypeError('Cannot store numbers of type ' + ', '.join(sorted({type(x).__name__ for x in values})) + '.')
+
+def exponent_matrix(monos):
+    ''' sorted variables of monomials monos and their exponents as a flat matrix (a row per monomial, 0 if missing) '''
+    variables = sorted({v for m in monos for v in m[::2]})
+    if all(len(m) == 2 * len(variables) for m in monos): # every monomial has every variable
+        return variables, [e for m in monos for e in m[1::2]]
+    column = {v: i for i, v in enumerate(variables)}
+    exponents, row = [0] * (len(monos) * len(variables)), 0
+    for m in monos:
+        for i in range(0, len(m), 2):
+            exponents[row + column[m[i]]] = m[i+1]
+        row += len(variables)
+    return variables, exponents
+
+def matrix_monomials(variables, exponents, count):
+    ''' the count monomials of a flat exponent matrix (inverse of exponent_matrix) '''
+    # monomials are zipped from the columns, then terms missing a variable drop its zero exponent
+    nvars, columns = len(variables), []
+    for i, v in enumerate(variables):
+        columns += (itertools.repeat(v), exponents[i::nvars])
+    monos = list(zip(*columns)) if nvars else [()] * count
+    if 0 in exponents:
+        for j, m in enumerate(monos):
+            if 0 in m[1::2]:
+                monos[j] = tuple([x for i in range(0, len(m), 2) if m[i+1] != 0 for x in m[i:i+2]])
+    return monos
+
+def pack_record(p, var_index):
+    ''' bytes of the record of polynomial p, var_index maps variable names to indices in the variable table '''
+    variables, exponents = exponent_matrix(p.coefs)
+
+    exp_kind, exp_data = pack_numbers(exponents)
+    coef_kind, coef_data = pack_numbers(list(p.coefs.values()), True)
+    indices = little_endian(array.array('I', [var_index[v] for v in variables]))
+    parts = [record_header.pack(len(variables), len(p.coefs), exp_kind.encode(), coef_kind.encode()),
+             indices, padding(len(indices)), exp_data, padding(len(exp_data)), coef_data, padding(len(coef_data))]
+    return b''.join(parts)
+
+def dumps(polys):
+    ''' packs a sequence of polynomials into bytes of the binary format (see laurentfile for reading) '''
+    polys = list(polys)
+    variables = sorted({v for p in polys for m in p.coefs for v in m[::2]})
+    var_index = {v: i for i, v in enumerate(variables)}
+
+    table = b''.join(struct.pack('<H', len(v.encode())) + v.encode() for v in variables)
+    head = file_header.pack(BINARY_MAGIC, BINARY_VERSION, 0, len(variables), len(polys)) + table + padding(len(table))
+    records = [pack_record(p, var_index) for p in polys]
+
+    offsets, position = [], len(head) + 8 * (len(polys) + 1)
+    for r in records:
+        offsets.append(position)
+        position += len(r)
+    offsets.append(position)
+    return b''.join([head, little_endian(array.array('Q', offsets))] + records)
+
+def dump(polys, file):
+    ''' writes polynomials in the binary format to file (a path or a binary file object) '''
+    data = dumps(polys)
+    if hasattr(file, 'write'):
+        file.write(data)
+    else:
+        with open(file, 'wb') as f:
+            f.write(data)
+
+def loads(data, cls = None):
+    ''' list of the polynomials stored in bytes data '''
+    return list(laurentfile(data, cls))
+
+def load(file, cls = None):
+    ''' list of the polynomials stored in file (a path or a binary file object) '''
+    if hasattr(file, 'read'):
+        return loads(file.read(), cls)
+    with laurentfile(file, cls) as f:
+        return list(f)
+
+
+class laurentfile:
+    ''' polynomials in the binary format, read from bytes or a memory mapped file;
+    records are decoded only when accessed, raw arrays are available without copying (see arrays) '''
+
+    def __init__(self, source, cls = None):
+        self.cls = cls or laurent
+        self.mmap = self.offsets = None
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            self.buffer = memoryview(source).cast('B')
+        else:
+            with open(source, 'rb') as f:
+                self.mmap = mmap.mmap(f.fileno(), 0, access = mmap.ACCESS_READ)
+            self.buffer = memoryview(self.mmap)
+        try:
+            self.read_header()
+        except ValueError:
+            self.close()
+            raise
+
+    def read_header(self):
+        ''' reads the file header, the variable names and the offsets of the records '''
+        if len(self.buffer) < file_header.size:
+            raise ValueError('Not a polynomial file (too short).')
+        magic, version, _, nvars, self.count = self.unpack(file_header, 0)
+        if magic != BINARY_MAGIC: raise ValueError('Not a polynomial file (bad magic).')
+        if version != BINARY_VERSION: raise ValueError('Unsupported polynomial file version ' + str(version) + '.')
+
+        names, position = [], file_header.size
+        for i in range(nvars):
+            length, = self.unpack(name_length, position)
+            name = self.buffer[position + 2 : position + 2 + length]
+            if len(name) < length: raise ValueError('Polynomial file is truncated.')
+            names.append(intern_var(bytes(name).decode()))
+            position += 2 + length
+        self.variables = tuple(names)
+        position += -position % 8
+        self.offsets = self.typed(position, 'Q', self.count + 1)
+
+    def unpack(self, layout, position):
+        ''' the fields of the struct layout at position '''
+        try:
+            return layout.unpack_from(self.buffer, position)
+        except struct.error:
+            raise ValueError('Polynomial file is truncated.') from None
+
+    def typed(self, position, fmt, count):
+        ''' count numbers of format fmt at position, a view of the buffer when possible '''
+        size = struct.calcsize(fmt) * count
+        view = self.buffer[position : position + size]
+        if len(view) < size: raise ValueError('Polynomial file is truncated.')
+        if sys.byteorder == 'big' and fmt != 'B':
+            a = array.array(fmt, view.tobytes())
+            a.byteswap()
+            return memoryview(a)
+        return view.cast(fmt)
+
+    def numbers(self, position, kind, count):
+        ''' the numbers of the given kind stored at position, as a list '''
+        if kind in int_kinds:
+            return self.typed(position, kind, count).tolist()
+        if kind == 'm':
+            values = self.typed(position, 'd', count).tolist()
+            flags = self.buffer[position + 8 * count : position + 9 * count]
+            return [int(x) if f else x for x, f in zip(values, flags)]
+        if kind == 'D':
+            values = self.typed(position, 'd', 2 * count).tolist()
+            return [complex(values[i], values[i+1]) for i in range(0, 2 * count, 2)]
+        if kind == 'n':
+            lengths = self.typed(position, 'I', count).tolist()
+            position += 4 * count + (-4 * count % 8)
+            values = []
+            for n in lengths:
+                values.append(int.from_bytes(self.buffer[position : position + n], 'little', signed = True))
+                position += n
+            return values
+        raise ValueError('Unknown number kind ' + repr(kind) + ' in polynomial file.')
+
+    def arrays(self, i):
+        ''' variables, exponent matrix (flat, a row per term) and coefficients of polynomial i;
+        integer exponents and integer or float coefficients are views of the file (no copy), other kinds are lists '''
+        position = self.offsets[i]
+        nvars, nterms, exp_kind, coef_kind = self.unpack(record_header, position)
+        position += record_header.size
+        variables = tuple(self.variables[j] for j in self.typed(position, 'I', nvars))
+        position += 4 * nvars + (-4 * nvars % 8)
+
+        exp_kind, coef_kind = exp_kind.decode(), coef_kind.decode()
+        size = nvars * nterms
+        if exp_kind in int_kinds:
+            exponents = self.typed(position, exp_kind, size)
+            position += struct.calcsize(exp_kind) * size
+        else:
+            exponents = self.numbers(position, exp_kind, size)
+            position += 9 * size
+        position += -position % 8
+        if coef_kind in int_kinds:
+            coefs = self.typed(position, coef_kind, nterms)
+        elif coef_kind == 'm' and not any(self.buffer[position + 8 * nterms : position + 9 * nterms]):
+            coefs = self.typed(position, 'd', nterms)
+        else:
+            coefs = self.numbers(position, coef_kind, nterms)
+        return variables, exponents, coefs
+
+    def get(self, i, cls = None):
+        ''' polynomial i (an instance of cls, by default the class given to the reader) '''
+        if not -self.count <= i < self.count: raise IndexError('Polynomial index out of range.')
+        variables, exponents, coefs = self.arrays(i % self.count)
+        exponents = exponents.tolist() if isinstance(exponents, memoryview) else exponents
+        coefs = coefs.tolist() if isinstance(coefs, memoryview) else coefs
+
+        monos = matrix_monomials(variables, exponents, len(coefs))
+        return (cls or self.cls).from_coefs(dict(zip(monos, coefs)))
+
+    def close(self):
+        ''' releases the buffer and closes the memory map; if views from arrays are still in use, the map stays
+        valid for them and is unmapped when the last of them is released '''
+        if self.buffer is None: return
+        if self.offsets is not None: self.offsets.release()
+        self.buffer.release()
+        self.offsets = self.buffer = None
+        if self.mmap is not None:
+            try:
+                self.mmap.close()
+            except BufferError:
+                pass # exported to views of arrays, which keep the map until they are gone
+            self.mmap = None
+
+    #def __del__(self, arg): N/A
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self.get(j) for j in range(*i.indices(self.count))]
+        return self.get(i)
+
+    def __iter__(self):
+        return (self.get(i) for i in range(self.count))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+# Pickling (see laurent.__reduce__), the state is a variable table, the packed exponent matrix and the coefficients
+
+def pack_coefs(coefs):
+    ''' variables, exponent kind, exponents (bytes for integer kinds, else a list) and coefficients of coefs '''
+    variables, exponents = exponent_matrix(coefs)
+    kind, data = pack_numbers(exponents)
+    return tuple(variables), kind, (data if kind in int_kinds else exponents), list(coefs.values())
+
+def unpack_coefs(variables, kind, data, coefs):
+    ''' the coefficient dictionary packed by pack_coefs '''
+    if kind in int_kinds:
+        exponents = array.array(kind)
+        exponents.frombytes(data)
+        if sys.byteorder == 'big': exponents.byteswap()
+        exponents = exponents.tolist()
+    else:
+        exponents = data
+    variables = [intern_var(v) for v in variables]
+    return dict(zip(matrix_monomials(variables, exponents, len(coefs)), coefs))
+
+def unpickle_laurent(cls, *state):
+    ''' polynomial of class cls from the state of laurent.__reduce__ '''
+    return cls.from_coefs(unpack_coefs(*state))
+
+
+# Bulk parsing
+
+parse_cache = lrucache(4096) # string -> frozenlaurent, shared by parse_many
+
+def parse_many(strings, cache = parse_cache):
+    ''' parses an iterable of polynomial strings into a list of polynomials,
+    repeated strings are parsed once and looked up in cache (an lrucache, None disables it) '''
+    result = []
+    for s in strings:
+        p = cache.get(s) if cache is not None else None
+        if p is None:
+            p = frozenlaurent.from_coefs(parse(s))
+            if cache is not None: cache.put(s, p)
+        result.append(laurent.from_coefs(dict(p.coefs)))
+    return result
+
+
+# Profiling
+
+def result_size(result):
+    ''' number of terms of a polynomial (or coefficient dictionary) result, the largest for lists of them '''
+    if isinstance(result, laurent): return len(result.coefs)
+    if isinstance(result, dict): return len(result)
+    if isinstance(result, (list, tuple)): return max((result_size(r) for r in result), default = 0)
+    return 0
+
+class profile:
+    ''' context manager counting calls, wall time (inclusive of nested calls) and the largest polynomial returned
+    for the operations of term, laurent and their subclasses and for the multiplication engines, e.g.
+    with profile() as prof: p ** 10; print(prof.report())
+    The methods are wrapped on entering and restored on exit, so there is no overhead outside the with block.
+    With memory = True tracemalloc snapshots are taken on entry and exit (see memory_top) and peak_memory is the peak
+    traced memory in the block (since tracing started if it was already on before Python 3.9), callback, if given, is
+    called as callback(name, seconds, result) after every operation. '''
+
+    operations = ('__init__', '__add__', '__sub__', '__mul__', '__pow__', '__divmod__', '__floordiv__', '__mod__',
+                  '__neg__', '__call__', '__iadd__', '__isub__', '__imul__', '__ipow__', 'canonical', 'add_term',
+                  'from_coefs', 'from_mono', 'mul', 'power', 'divide', 'substitute', 'evaluate', 'evaluate_batch',
+                  'compile', 'collect', 'min_deg', 'max_deg', 'span', 'gcd', 'sum', 'prod')
+
+    def __init__(self, memory = False, callback = None):
+        self.memory, self.callback = memory, callback
+        self.stats = {} # name -> {'calls', 'time', 'peak_terms'}
+        self.snapshots = None
+        self.peak_memory = None
+        self.saved = []
+
+    def __enter__(self):
+        classes, stack = [], [term, laurent]
+        while stack:
+            cls = stack.pop()
+            classes.append(cls)
+            stack += cls.__subclasses__()
+        for cls in classes:
+            for name in self.operations:
+                if name in cls.__dict__:
+                    self.saved.append((cls, name, cls.__dict__[name]))
+                    setattr(cls, name, self.wrap_attribute(cls.__name__ + '.' + name, cls.__dict__[name]))
+        self.saved_engines = dict(laurent.mul_engines)
+        for name, f in self.saved_engines.items():
+            laurent.mul_engines[name] = self.wrap(f.__name__, f)
+
+        if self.memory:
+            self.started_tracing = not tracemalloc.is_tracing()
+            if self.started_tracing: tracemalloc.start()
+            if hasattr(tracemalloc, 'reset_peak'): tracemalloc.reset_peak() # Python 3.9, the peak counts from the start of tracing before
+            self.snapshots = [tracemalloc.take_snapshot()]
+        return self
 
+    def __exit__(self, *args):
+        if self.memory:
+            self.snapshots.append(tracemalloc.take_snapshot())
+            self.peak_memory = tracemalloc.get_traced_memory()[1]
+            if self.started_tracing: tracemalloc.stop()
+        laurent.mul_engines.clear()
+        laurent.mul_engines.update(self.saved_engines)
+        for cls, name, attribute in reversed(self.saved):
+            setattr(cls, name, attribute)
+        self.saved = []
+
+    def wrap_attribute(self, name, attribute):
+        ''' wrapped class attribute (function, classmethod or staticmethod) '''
+        if isinstance(attribute, classmethod): return classmethod(self.wrap(name, attribute.__func__))
+        if isinstance(attribute, staticmethod): return staticmethod(self.wrap(name, attribute.__func__))
+        return self.wrap(name, attribute)
+
+    def wrap(self, name, f):
+        ''' f counting its calls and time in stats[name] '''
+        stats = self.stats.setdefault(name, {'calls': 0, 'time': 0.0, 'peak_terms': 0})
+        callback = self.callback
+        @functools.wraps(f)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            result = f(*args, **kwargs)
+            seconds = time.perf_counter() - start
+            stats['calls'] += 1
+            stats['time'] += seconds
+            size = result_size(result)
+            if size > stats['peak_terms']: stats['peak_terms'] = size
+            if callback is not None: callback(name, seconds, result)
+            return result
+        return wrapper
+
+    @property
+    def term_allocations(self):
+        ''' number of term objects created '''
+        return sum(self.stats.get('term.' + name, {'calls': 0})['calls'] for name in ('__init__', 'from_mono'))
+
+    @property
+    def peak_terms(self):
+        ''' the number of terms of the largest polynomial returned '''
+        return max((s['peak_terms'] for s in self.stats.values()), default = 0)
+
+    def memory_top(self, limit = 10):
+        ''' the lines of code that allocated most memory between entry and exit (needs memory = True) '''
+        if not self.snapshots or len(self.snapshots) < 2: return []
+        return self.snapshots[1].compare_to(self.snapshots[0], 'lineno')[:limit]
+
+    def report(self, sort = 'time', limit = None):
+        ''' table of the operations called, sorted by 'time', 'calls' or 'peak_terms' '''
+        rows = sorted(((name, s) for name, s in self.stats.items() if s['calls']), key = lambda r: -r[1][sort])[:limit]
+        lines = ['%-28s %10s %12s %12s %10s' % ('operation', 'calls', 'time (ms)', 'per call', 'peak terms')]
+        for name, s in rows:
+            lines.append('%-28s %10d %12.3f %12.6f %10d' % (name, s['calls'], s['time'] * 1000, s['time'] * 1000 / s['calls'], s['peak_terms']))
+        lines.append('term allocations: %d, peak terms: %d' % (self.term_allocations, self.peak_terms))
+        if self.peak_memory is not None: lines.append('peak traced memory: %d bytes' % self.peak_memory)
+        return '\n'.join(lines)
@@ -0,0 +1,254 @@
+''' randomized checks of the laurent module against straightforward computations, run with python -m pytest '''
+
+import random
+import pickle
+import operator
+import tracemalloc
+
+import pytest
+
+from laurent import term, laurent, frozenlaurent, modlaurent, isqrt, inverse_mod, mono_from_dict, dumps, loads, dump, load, laurentfile, profile
+
+
+def random_laurent(rng, terms, variables = 'xyz', degree = 3, coefs = (-5, 5)):
+    ''' random polynomial with up to terms terms, exponents in [-degree, degree], nonzero integer coefficients '''
+    p = {}
+    for _ in range(terms):
+        vs = rng.sample(variables, rng.randint(0, len(variables)))
+        p[mono_from_dict({v: rng.randint(-degree, degree) for v in vs})] = rng.choice([c for c in range(coefs[0], coefs[1] + 1) if c])
+    return laurent.from_coefs(p)
+
+def divides(h, p):
+    ''' True if h divides p exactly (as Laurent polynomials) '''
+    try:
+        q, r = p.divide(h, exact = True)
+    except ValueError:
+        return False
+    return r.zeroQ() and q * h == p
+
+
+@pytest.mark.parametrize('seed', range(300))
+def test_gcd_common_factor(seed):
+    rng = random.Random(seed)
+    a, b, c = (random_laurent(rng, rng.randint(3, 7)) for _ in range(3))
+    if a.zeroQ() or b.zeroQ() or c.zeroQ(): return
+    h = (a * c).gcd(b * c)
+    assert divides(c, h)
+    assert divides(h, a * c) and divides(h, b * c)
+
+def test_integer_helpers():
+    rng = random.Random(0)
+    for n in list(range(1000)) + [rng.getrandbits(rng.randint(1, 400)) for _ in range(1000)]:
+        r = isqrt(n)
+        assert r * r <= n < (r + 1) * (r + 1)
+    for m in (2, 7, 2 ** 31 - 1):
+        for a in range(-50, 50):
+            if a % m: assert a * inverse_mod(a, m) % m == 1
+    with pytest.raises(ValueError):
+        inverse_mod(14, 7)
+
+def test_gcd_regression():
+    a = laurent('- 1 + 2xy^-3 + 5xz + 2y^-3z + y^-2 - 4z^-2')
+    b = laurent('4 - 5x^2z + 3z^2')
+    c = laurent('x^2y + 2z')
+    assert (a * c).gcd(b * c) == c
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_lazy_matches_eager(seed):
+    rng = random.Random(seed)
+    p, q, r = (random_laurent(rng, rng.randint(1, 6)) for _ in range(3))
+    s = p.lazy() * q
+    e = (s + r) * (s - p * 2) + r.lazy() ** 3 - s
+    assert e.value() == (p * q + r) * (p * q - p * 2) + r ** 3 - p * q
+
+def test_lazy_value_is_a_copy():
+    x = laurent('x')
+    v = (x.lazy() + 1).value()
+    v += x
+    assert (x.lazy() + 1).value() == laurent('1 + x') and repr(x.lazy() + 1) == repr(laurent('1 + x'))
+    with pytest.raises(TypeError):
+        (x.lazy() + 1).add_term((), 1)
+
+def test_lazy_keeps_modulus():
+    F = modlaurent.over(7)
+    v = (F('3x+5').lazy() * F('4x+6').lazy()).value()
+    assert type(v) is F and v == F('3x+5') * F('4x+6')
+    assert (F('x').lazy() * 2 + F('x').freeze().lazy() + 1).value() == F('3x + 1')
+    with pytest.raises(ValueError):
+        (F('x').lazy() + laurent('x').lazy()).value()
+
+def test_modular_domains():
+    F = modlaurent.over(7)
+    p = F('10x + 3').freeze()
+    assert isinstance(p, F) and p.modulus == 7 and p == F('3x + 3') and p != laurent('3x + 3')
+    assert type(p * p) is type(p) and p * p == F('3x + 3') ** 2
+    assert frozenlaurent.intern(laurent('3x + 3')) is not frozenlaurent.intern(F('3x + 3'))
+    assert pickle.loads(pickle.dumps(p)) == p and type(pickle.loads(pickle.dumps(p))) is type(p)
+    for a, b in ((laurent('x'), F('x')), (F('x'), laurent('x')), (F('x'), modlaurent.over(5)('x'))):
+        assert a != b and b != a
+        for op in (operator.add, operator.sub, operator.mul, operator.iadd):
+            with pytest.raises(ValueError):
+                op(a, b)
+    assert F('x') + 8 == F('x + 1') and F('x') * term('9y') == F('2xy')
+    for n in (8, 1, 0, -7, 7.0):
+        with pytest.raises(ValueError):
+            modlaurent.over(n)
+
+@pytest.mark.parametrize('seed', range(20))
+def test_addmul_matches_eager(seed):
+    rng = random.Random(seed)
+    acc, a, b = (random_laurent(rng, rng.randint(0, 8)) for _ in range(3))
+    expected = acc + a * b - b * b
+    acc.addmul(a, b)
+    acc.submul(b, b)
+    assert acc == expected and all(c != 0 for c in acc.coefs.values())
+    expected = acc + acc * a
+    acc.addmul(acc, a)
+    assert acc == expected
+
+@pytest.mark.parametrize('seed', range(40))
+def test_carried_box_matches_scan(seed):
+    rng = random.Random(seed)
+    a, b = (random_laurent(rng, rng.randint(1, 5), degree = 1) for _ in range(2))
+    a.box(), b.box()
+    for p in (a * b, a * a * b, b ** 3, a * laurent.from_coefs({m: 1 for m in a.coefs}) ** 0):
+        fresh = laurent.from_coefs(dict(p.coefs))
+        assert p.box() == fresh.box() and p.vars() == fresh.vars() and p.span() == fresh.span()
+
+def test_cancelled_variable():
+    a, b = laurent('x'), laurent('x^-1')
+    a.box(), b.box()
+    assert (a * b).vars() == [] and (a * b).span() == {}
+
+@pytest.mark.parametrize('seed', range(30))
+@pytest.mark.parametrize('order', ['print', 'lex', 'grlex', 'grevlex'])
+def test_divide(seed, order):
+    rng = random.Random(seed)
+    a, b = random_laurent(rng, rng.randint(0, 8), degree = 2), random_laurent(rng, rng.randint(1, 5), degree = 2)
+    if b.zeroQ(): return
+    q, r = a.divide(b, order)
+    assert q * b + r == a
+    assert (a * b).divide(b, order, exact = True) == [a, laurent(0)]
+    assert laurent(0).divide(b, order) == [laurent(0), laurent(0)]
+    assert laurent(0).divide(b, order, exact = True) == [laurent(0), laurent(0)]
+
+def random_window(rng):
+    ''' random bounds and total degree bound for truncated arithmetic, with open ends '''
+    bounds = {v: (rng.choice([None, rng.randint(-6, 2)]), rng.choice([None, rng.randint(-2, 6)]))
+              for v in rng.sample('xyz', rng.randint(0, 2))}
+    degree = rng.choice([None, (rng.choice([None, rng.randint(-6, 0)]), rng.choice([None, rng.randint(0, 6)]))])
+    return bounds, degree
+
+def dense_laurent(rng, degree):
+    ''' random polynomial in x and y filling most of the box [-degree, degree]^2 '''
+    return laurent.from_coefs({mono_from_dict({'x': i, 'y': j}): rng.randint(1, 9)
+                               for i in range(-degree, degree + 1) for j in range(-degree, degree + 1) if rng.random() < 0.9})
+
+@pytest.mark.parametrize('seed', range(60))
+def test_truncated_matches_full(seed):
+    rng = random.Random(seed)
+    bounds, degree = random_window(rng)
+    a, b = random_laurent(rng, rng.randint(0, 10)), random_laurent(rng, rng.randint(1, 10))
+    assert a.mul_trunc(b, bounds, degree) == (a * b).truncate(bounds, degree)
+    n = rng.randint(0, 5)
+    assert a.pow_trunc(n, bounds, degree) == (a ** n).truncate(bounds, degree)
+    c, d = dense_laurent(rng, rng.randint(1, 4)), dense_laurent(rng, rng.randint(1, 4))
+    assert c.mul_trunc(d, bounds, degree) == (c * d).truncate(bounds, degree)
+    assert c.pow_trunc(3, bounds, degree) == (c ** 3).truncate(bounds, degree)
+
+@pytest.mark.parametrize('seed', range(60))
+@pytest.mark.parametrize('order', ['print', 'lex', 'grlex', 'grevlex'])
+def test_division(seed, order):
+    rng = random.Random(seed)
+    a, b = random_laurent(rng, rng.randint(0, 8), degree = 2), random_laurent(rng, rng.randint(1, 5), degree = 2)
+    if b.zeroQ(): return
+    bounds, degree = random_window(rng)
+    if rng.random() < 0.5: degree = (rng.randint(-6, 2), rng.choice([None, rng.randint(0, 6)])) # early stop
+    c = a * b + random_laurent(rng, rng.randint(0, 3), degree = 2)
+    q, r = c.divide(b, order)
+    assert c.divmod_trunc(b, bounds, degree, order) == [q.truncate(bounds, degree), r.truncate(bounds, degree)]
+
+def test_division_window_order():
+    a, b = laurent('x^3 + y^3 + xy + 1'), laurent('x + y^2')
+    q, r = a.divide(b, 'grevlex')
+    assert a.divmod_trunc(b, {'x': (0, 5)}, order = 'grevlex') == [q.truncate({'x': (0, 5)}), r.truncate({'x': (0, 5)})]
+    assert a.divmod_trunc(b, degree = (1, None), order = 'grevlex') == [q.truncate(degree = (1, None)), r.truncate(degree = (1, None))]
+
+def test_term_degree_read_only():
+    t = term('3x^2y^-1')
+    assert t.degree == {'x': 2, 'y': -1}
+    with pytest.raises(TypeError):
+        t.degree['x'] = 5
+    assert t.mono == ('x', 2, 'y', -1)
+
+@pytest.mark.parametrize('cls', [laurent, modlaurent.over(2), modlaurent.over(7)])
+def test_inplace_self(cls):
+    p = cls('3x + y^-1 + 2')
+    q = cls(p)
+    q += q
+    assert q == p + p
+    q -= q
+    assert q.zeroQ() and q == cls(0)
+
+@pytest.mark.parametrize('seed', range(20))
+def test_evaluate_direct_matches_plan(seed):
+    rng = random.Random(seed)
+    p = random_laurent(rng, rng.randint(0, 8))
+    point = {v: rng.choice([rng.randint(-3, 3) or 1, rng.uniform(-2, 2)]) for v in 'xyz'}
+    once = p.evaluate(point)
+    assert 'plan' not in p._cache
+    assert p.evaluate(point) == once and 'plan' in p._cache
+
+
+def stored_polys(rng):
+    ''' polynomials with every kind of exponent and coefficient the binary format stores '''
+    return [random_laurent(rng, rng.randint(0, 6)), laurent(0), laurent('3x^200 - 7y^-40000z'),
+            laurent.from_coefs({('x', 1): 2 ** 80, ('y', -2): -3}), laurent.from_coefs({('x', 0.5): 1.5, (): 2}),
+            laurent.from_coefs({('z', 3): 1 + 2j})]
+
+@pytest.mark.parametrize('seed', range(5))
+def test_binary_round_trip(seed, tmp_path):
+    polys = stored_polys(random.Random(seed))
+    assert loads(dumps(polys)) == polys
+    path = str(tmp_path / 'polys.laur')
+    dump(polys, path)
+    assert load(path) == polys
+    with laurentfile(path) as f:
+        assert len(f) == len(polys) and f[-1] == polys[-1] and f[1:3] == polys[1:3]
+        variables, exponents, coefs = f.arrays(0)
+        assert laurent.from_coefs({mono_from_dict(dict(zip(variables, exponents[i * len(variables) : (i + 1) * len(variables)]))): c
+                                   for i, c in enumerate(coefs)}) == polys[0]
+        del exponents, coefs
+    assert load(open(path, 'rb')) == polys
+
+def test_binary_corrupted(tmp_path):
+    data = dumps(stored_polys(random.Random(0)))
+    for n in range(len(data)):
+        try:
+            loads(data[:n])
+        except ValueError:
+            continue
+        assert False, 'truncated to %d bytes' % n
+    with pytest.raises(ValueError):
+        loads(b'LAUX' + data[4:])
+    path = tmp_path / 'short.laur'
+    path.write_bytes(data[:20])
+    with pytest.raises(ValueError):
+        laurentfile(str(path))
+
+@pytest.mark.parametrize('reset_peak', [True, False])
+def test_profile_memory(reset_peak, monkeypatch):
+    if not reset_peak: monkeypatch.delattr(tracemalloc, 'reset_peak', raising = False)
+    with profile(memory = True) as prof:
+        laurent('x + y + 1') ** 6
+    assert prof.peak_memory > 0 and prof.stats['laurent.__pow__']['calls'] == 1
+
+def test_collected_is_not_shared():
+    p = laurent('2Ax + 2x + y + 3xB^-1')
+    groups = p.collected('x')
+    assert groups == {('x', 1): laurent('2A + 2 + 3B^-1'), (): laurent('y')}
+    groups[('x', 1)] = laurent(0)
+    with pytest.raises(TypeError):
+        p.collected('x')[()].add_term((), 1)
+    assert p.collected('x') == {('x', 1): laurent('2A + 2 + 3B^-1'), (): laurent('y')}